@@ -0,0 +1,111 @@
+import numpy as np
+from PIL import Image
+
+from similarity import MAGENTA
+
+# Normalised logos are all this size
+IMAGE_SIZE = (256, 256)
+
+# Number of images held in memory at once by batch_color_features
+COLOR_BATCH_SIZE = 512
+
+# Channel bins for the color histograms (HISTOGRAM_BINS ** 3 buckets)
+HISTOGRAM_BINS = 8
+
+
+def load_image_stack(paths, size=IMAGE_SIZE, memmap_path=None):
+    """Decode images into one (N, H, W, 3) uint8 array, optionally backed by a .npy memmap"""
+    shape = (len(paths), size[1], size[0], 3)
+    if memmap_path:
+        stack = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=np.uint8, shape=shape)
+    else:
+        stack = np.empty(shape, dtype=np.uint8)
+    for i, path in enumerate(paths):
+        with Image.open(path) as img:
+            img = img.convert('RGB')
+            if img.size != size:
+                img = img.resize(size)
+            stack[i] = np.asarray(img)
+    return stack
+
+
+def content_mask(stack, bg_color=MAGENTA):
+    """(N, H, W) boolean mask of the pixels that are not background"""
+    # Channel by channel, so no (N, H, W, 3) temporary is allocated
+    mask = stack[..., 0] != bg_color[0]
+    mask |= stack[..., 1] != bg_color[1]
+    mask |= stack[..., 2] != bg_color[2]
+    return mask
+
+
+def masked_mean_colors(stack, mask=None):
+    """Average RGB of the non-background pixels of every image, floored like the per-file version.
+    Rows of images with no content are -1."""
+    if mask is None:
+        mask = content_mask(stack)
+    counts = mask.sum(axis=(1, 2))
+    sums = np.einsum('nhwc,nhw->nc', stack, mask, dtype=np.uint64)
+    means = np.full((len(stack), 3), -1, dtype=np.int64)
+    has_content = counts > 0
+    means[has_content] = np.floor(sums[has_content] / counts[has_content, None]).astype(np.int64)
+    return means
+
+
+def color_histograms(stack, mask=None, bins=HISTOGRAM_BINS):
+    """Normalised (N, bins ** 3) color histograms over the non-background pixels"""
+    if mask is None:
+        mask = content_mask(stack)
+    step = 256 // bins
+    # Bucket ids fit in 16 bits for the usual bin counts: 2 bytes per pixel instead of
+    # the 32 bytes an int64 copy of the whole RGB stack would take
+    bucket = (stack[..., 0] // step).astype(np.uint16 if bins ** 3 <= 1 << 16 else np.uint32)
+    bucket *= bins
+    bucket += stack[..., 1] // step
+    bucket *= bins
+    bucket += stack[..., 2] // step
+    hist = np.empty((len(stack), bins ** 3), dtype=np.float32)
+    for i in range(len(stack)):
+        hist[i] = np.bincount(bucket[i][mask[i]], minlength=bins ** 3)
+    totals = hist.sum(axis=1, keepdims=True)
+    np.divide(hist, totals, out=hist, where=totals > 0)
+    return hist
+
+
+def dominant_colors(hist, bins=HISTOGRAM_BINS):
+    """Center RGB of the most populated histogram bucket, -1 rows for empty images"""
+    top = hist.argmax(axis=1)
+    step = 256 // bins
+    colors = np.stack([top // (bins * bins), (top // bins) % bins, top % bins], axis=1) * step + step // 2
+    colors[hist.sum(axis=1) == 0] = -1
+    return colors
+
+
+def stack_color_features(stack):
+    """Mean and dominant color of every image of a stack, as feature dicts"""
+    mask = content_mask(stack)
+    means = masked_mean_colors(stack, mask)
+    dominant = dominant_colors(color_histograms(stack, mask))
+    return [{
+        'avg_rgb': tuple(int(c) for c in mean) if mean[0] >= 0 else None,
+        'dominant_rgb': tuple(int(c) for c in dom) if dom[0] >= 0 else None,
+    } for mean, dom in zip(means, dominant)]
+
+
+def batch_color_features(paths, batch_size=COLOR_BATCH_SIZE, rows=None, tensor=None):
+    """Mean and dominant color for every path, computed batch by batch over stacked images.
+    When rows gives each path's row in a memory-mapped tensor store, pixels are read from it
+    instead of decoding the files (None rows are still decoded)."""
+    features = []
+    for start in range(0, len(paths), batch_size):
+        batch_rows = rows[start:start + batch_size] if rows is not None else [None]
+        if tensor is not None and all(row is not None for row in batch_rows):
+            first = batch_rows[0]
+            if batch_rows == list(range(first, first + len(batch_rows))):
+                # Contiguous rows: a zero-copy view of the memmap
+                stack = tensor[first:first + len(batch_rows)]
+            else:
+                stack = tensor[batch_rows]
+        else:
+            stack = load_image_stack(paths[start:start + batch_size])
+        features.extend(stack_color_features(stack))
+    return features
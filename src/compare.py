@@ -6,15 +6,59 @@ import shutil
 from PIL import Image
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+import color_features
+import feature_cache
+import logo_store
+import normalise
+import similarity
 
 # Configurare
 input_folder = '../data/logos/normalised'
 output_base_folder = '../data/logos/grouped_by_text_or_color'
 output_json_path = '../data/logos/groups.json'
-COLOR_TOLERANCE = 1  # Toleranță culoare (0 = strict, >0 = mai permisiv)
-
-# Structură pentru grupuri
-text_groups = defaultdict(list)
+COLOR_DISTANCE = 3.0  # Distanța maximă în spațiul Lab (ΔE) între culori din aceeași grupă
+PHASH_THRESHOLD = 6  # Distanță Hamming maximă pHash pentru aproape-duplicate
+DHASH_THRESHOLD = 10  # Distanță Hamming maximă dHash, verificare suplimentară
+TEXT_MAX_EDIT_RATIO = 0.2  # Distanța de editare maximă, ca fracție din lungimea textului
+OCR_WORKERS = os.cpu_count() or 1  # Număr de procese pentru OCR (1 = serial)
+OCR_LANG = 'eng'
+OCR_PSM = 6
+OCR_OEM = 3
+OCR_CONFIG = f'--psm {OCR_PSM} --oem {OCR_OEM} -c preserve_interword_spaces=1'
+# 'tesserocr' = un motor tesseract încărcat o singură dată per proces, imaginile trimise din memorie;
+# 'pytesseract' = un proces tesseract nou (și fișier temporar) pentru fiecare imagine
+OCR_BACKEND = 'tesserocr' if tesserocr is not None else 'pytesseract'
+OCR_THRESHOLD = 180
+OCR_LUT = [255 if p > OCR_THRESHOLD else 0 for p in range(256)]  # binarizare prin tabel, fără lambda
+OCR_PREP_MODE = 'cropped'  # 'cropped' = decupare la conținut + upscale adaptiv, 'legacy' = tot canvasul ×2
+OCR_GLYPH_HEIGHT = 32  # Înălțimea (px) spre care se scalează literele estimate
+OCR_MAX_UPSCALE = 4
+OCR_PADDING = 8  # Margine adăugată în jurul decupajului, tesseract citește prost textul lipit de margine
+OCR_MIN_EDGE_DENSITY = 0.02  # Sub această densitate de muchii imaginea e tratată ca icon fără text
+OCR_MIN_ROW_TRANSITIONS = 3  # Textul are multe tranziții pe rând; formele pline au doar 2
+FEATURE_CACHE_PATH = '../data/logos/feature_cache.sqlite'
+# Tot ce influențează caracteristicile; orice schimbare invalidează cache-ul
+FEATURE_CONFIG = {
+    'version': 3,
+    'lang': OCR_LANG,
+    'ocr_config': OCR_CONFIG,
+    'backend': OCR_BACKEND,
+    'threshold': OCR_THRESHOLD,
+    'upscale': 2,
+    'prep_mode': OCR_PREP_MODE,
+    'glyph_height': OCR_GLYPH_HEIGHT,
+    'max_upscale': OCR_MAX_UPSCALE,
+    'padding': OCR_PADDING,
+    'min_edge_density': OCR_MIN_EDGE_DENSITY,
+    'min_row_transitions': OCR_MIN_ROW_TRANSITIONS,
+}
 
 # === Funcții OCR și procesare imagine ===
 
@@ -26,73 +70,279 @@ def clean_ocr_text(text):
 def prepare_for_ocr(img):
     gray = img.convert('L')  # grayscale
     resized = gray.resize((img.width * 2, img.height * 2))  # upscale
-    threshold = resized.point(lambda p: 255 if p > 180 else 0)  # binarizare dură
+    threshold = resized.point(OCR_LUT)  # binarizare dură
     return threshold
 
-def get_average_rgb_ignore_magenta(image):
-    arr = np.array(image.convert('RGB')).reshape(-1, 3)
-    non_magenta = arr[~np.all(arr == [255, 0, 255], axis=1)]
-    if len(non_magenta) == 0:
+def estimate_glyph_height(binary):
+    """Înălțimea mediană a benzilor de rânduri care conțin tranziții alb/negru (aprox. înălțimea literelor)"""
+    has_ink = (np.diff(binary, axis=1) != 0).any(axis=1)
+    bands = []
+    run = 0
+    for row in has_ink:
+        if row:
+            run += 1
+        elif run:
+            bands.append(run)
+            run = 0
+    if run:
+        bands.append(run)
+    return int(np.median(bands)) if bands else 0
+
+def edge_density(binary):
+    """Fracția de pixeli aflați pe o tranziție orizontală sau verticală"""
+    if binary.shape[0] < 2 or binary.shape[1] < 2:
+        return 0.0
+    edges = (np.diff(binary, axis=1) != 0).sum() + (np.diff(binary, axis=0) != 0).sum()
+    return edges / binary.size
+
+def looks_like_text(binary):
+    """Verificare ieftină înainte de tesseract: destule muchii și mai multe tranziții pe rând"""
+    if edge_density(binary) < OCR_MIN_EDGE_DENSITY:
+        return False
+    transitions = (np.diff(binary, axis=1) != 0).sum(axis=1)
+    inked_rows = transitions[transitions > 0]
+    return len(inked_rows) > 0 and inked_rows.mean() >= OCR_MIN_ROW_TRANSITIONS
+
+def prepare_for_ocr_cropped(img):
+    """Decupare la zona fără magenta, binarizare prin LUT și upscale doar cât e nevoie.
+    Întoarce None dacă imaginea nu are structură de text și OCR-ul poate fi sărit."""
+    box = similarity.content_box(np.asarray(img.convert('RGB')))
+    if box is None:
+        return None
+    gray = Image.fromarray(box).convert('L')  # grayscale
+    threshold = gray.point(OCR_LUT)  # binarizare dură
+    binary = np.asarray(threshold)
+    if not looks_like_text(binary):
         return None
-    avg = tuple(np.mean(non_magenta, axis=0).astype(int))
-    return avg
 
-def quantize_rgb(rgb, tolerance):
-    return tuple((c // tolerance) * tolerance for c in rgb)
+    glyph_height = estimate_glyph_height(binary)
+    scale = 1
+    if 0 < glyph_height < OCR_GLYPH_HEIGHT:
+        scale = min(OCR_MAX_UPSCALE, -(-OCR_GLYPH_HEIGHT // glyph_height))
+    if scale > 1:
+        threshold = threshold.resize((threshold.width * scale, threshold.height * scale), Image.Resampling.NEAREST)
 
-# === Procesare imagini ===
+    # Magenta devine negru la binarizare, deci marginea e neagră ca în modul legacy
+    padded = Image.new('L', (threshold.width + 2 * OCR_PADDING, threshold.height + 2 * OCR_PADDING), 0)
+    padded.paste(threshold, (OCR_PADDING, OCR_PADDING))
+    return padded
+
+# Motorul tesseract al procesului curent, creat la prima imagine și refolosit apoi
+_tess_api = None
+
+def get_tess_api():
+    global _tess_api
+    if _tess_api is None:
+        _tess_api = tesserocr.PyTessBaseAPI(lang=OCR_LANG, psm=OCR_PSM, oem=OCR_OEM)
+        _tess_api.SetVariable('preserve_interword_spaces', '1')
+    return _tess_api
+
+def run_ocr(ocr_ready):
+    if OCR_BACKEND == 'tesserocr':
+        api = get_tess_api()
+        api.SetImage(ocr_ready)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(
+        ocr_ready,
+        lang=OCR_LANG,
+        config=OCR_CONFIG
+    )
+
+def ocr_text(img):
+    if OCR_PREP_MODE == 'legacy':
+        ocr_ready = prepare_for_ocr(img)
+    else:
+        ocr_ready = prepare_for_ocr_cropped(img)
+        if ocr_ready is None:
+            return ''
+    return clean_ocr_text(run_ocr(ocr_ready))
+
+def image_features(img, pixels=None):
+    """Text OCR și hash-uri perceptuale pentru o imagine deja încărcată"""
+    text = ocr_text(img)
+    if pixels is None:
+        pixels = np.asarray(img.convert('RGB'))
+    hashes = similarity.image_hashes(pixels)
+    return {'text': text, 'hashes': hashes}
+
+# Tensorul memory-mapped al normalise.py, deschis o singură dată în fiecare proces
+_tensor_store = None
+
+def store_pixels(row):
+    """Pixelii rândului row din tensorul normalise.py, fără copiere"""
+    global _tensor_store
+    if _tensor_store is None:
+        _tensor_store = np.load(normalise.tensor_path, mmap_mode='r')
+    return _tensor_store[row]
+
+def extract_features(path, row=None):
+    """Text OCR și hash-uri perceptuale; culorile se calculează separat, vectorizat, pe loturi.
+    Când row e dat, pixelii se citesc din tensorul memory-mapped în loc să se decodeze PNG-ul."""
+    if row is not None:
+        pixels = store_pixels(row)
+        return image_features(Image.fromarray(pixels), pixels)
+    with Image.open(path) as img:
+        return image_features(img)
+
+def compute_features(paths, rows=None, workers=OCR_WORKERS):
+    """Rulează extract_features pe un pool de procese; rezultatele păstrează ordinea din paths"""
+    if rows is None:
+        rows = [None] * len(paths)
+    if workers <= 1:
+        return [extract_features(path, row) for path, row in zip(paths, rows)]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(extract_features, paths, rows, chunksize=chunksize))
+
+def load_features(paths, cache_path=FEATURE_CACHE_PATH):
+    """Caracteristici din cache după hash-ul conținutului; se calculează doar imaginile noi"""
+    cache = feature_cache.open_cache(cache_path)
+    config = feature_cache.config_fingerprint(FEATURE_CONFIG)
+    hashes = [feature_cache.file_hash(path) for path in paths]
+
+    cached = feature_cache.get_features(cache, hashes, config)
+    missing = [i for i, h in enumerate(hashes) if h not in cached]
+    print(f"🗃️ Cache: {len(paths) - len(missing)} imagini din cache | {len(missing)} de procesat")
+
+    missing_paths = [paths[i] for i in missing]
+    # Pixelii se citesc din tensorul memory-mapped al normalise.py pentru fișierele neschimbate
+    # de la construirea lui, atât pentru OCR/hash-uri cât și pentru culori
+    store = normalise.open_tensor_store()
+    rows = [normalise.tensor_row(store, os.path.basename(path), normalise.file_signature(path))
+            for path in missing_paths]
+    computed = compute_features(missing_paths, rows)
+    # Culoarea medie (ignorând magenta) pentru toate imaginile noi, în câteva operații NumPy
+    colors = color_features.batch_color_features(missing_paths, rows=rows,
+                                                 tensor=store[0] if store is not None else None)
+    new_items = {hashes[i]: dict(feat, **color) for i, feat, color in zip(missing, computed, colors)}
+    feature_cache.put_features(cache, new_items, config)
+    cached.update(new_items)
+
+    removed = feature_cache.evict_missing(cache, hashes)
+    if removed:
+        print(f"🗑️ Cache: {removed} intrări eliminate pentru imagini care nu mai există")
+    cache.close()
 
-for filename in os.listdir(input_folder):
-    if filename.lower().endswith('.png'):
-        path = os.path.join(input_folder, filename)
-
-        with Image.open(path) as img:
-            ocr_ready = prepare_for_ocr(img)
-            text = pytesseract.image_to_string(
-                ocr_ready,
-                lang='eng',
-                config='--psm 6 --oem 3 -c preserve_interword_spaces=1'
-            )
-            text = clean_ocr_text(text)
-
-            if text:
-                text_groups[text].append(filename)
-            else:
-                avg_rgb = get_average_rgb_ignore_magenta(img)
-                if avg_rgb is None:
-                    group_key = "magenta_bg"
-                else:
-                    quantized_rgb = quantize_rgb(avg_rgb, COLOR_TOLERANCE)
-                    group_key = f"color_{quantized_rgb[0]}_{quantized_rgb[1]}_{quantized_rgb[2]}"
-                text_groups[group_key].append(filename)
+    features = []
+    for h in hashes:
+        feat = dict(cached[h])
+        for key in ['avg_rgb', 'dominant_rgb']:
+            if feat[key] is not None:
+                feat[key] = tuple(feat[key])
+        features.append(feat)
+    return features
+
+def color_group_keys(features, max_distance=COLOR_DISTANCE):
+    """Cheile de culoare pentru logo-urile fără text: vecinii în spațiul Lab (căutați prin
+    indexul grid) sunt uniți, iar grupa e numită după culoarea medie a membrilor"""
+    indices = [i for i, feat in enumerate(features) if not feat['text'] and feat['avg_rgb'] is not None]
+    if not indices:
+        return {}
+    rgb = np.array([features[i]['avg_rgb'] for i in indices])
+    clusters = similarity.DisjointSet(len(indices))
+    similarity.union_within_radius(similarity.rgb_to_lab(rgb), max_distance, clusters)
+
+    members = defaultdict(list)
+    for position in range(len(indices)):
+        members[clusters.find(position)].append(position)
+
+    keys = {}
+    for positions in members.values():
+        mean_rgb = rgb[positions].mean(axis=0).round().astype(int)
+        key = f"color_{mean_rgb[0]}_{mean_rgb[1]}_{mean_rgb[2]}"
+        for position in positions:
+            keys[indices[position]] = key
+    return keys
+
+def group_key_for(feat, color_key=None):
+    if feat['text']:
+        return feat['text']
+    if feat['avg_rgb'] is None:
+        return "magenta_bg"
+    return color_key
+
+def group_logos(filenames, features):
+    """Gruparea se face abia după ce toate caracteristicile au fost calculate.
+    Imaginile cu aceeași cheie (text/culoare) și aproape-duplicatele după hash-ul
+    perceptual ajung în aceeași componentă conexă."""
+    color_keys = color_group_keys(features)
+    keys = [group_key_for(feat, color_keys.get(i)) for i, feat in enumerate(features)]
+    components = similarity.DisjointSet(len(filenames))
+
+    # Aceeași cheie -> aceeași grupă
+    first_with_key = {}
+    for i, key in enumerate(keys):
+        components.union(first_with_key.setdefault(key, i), i)
+
+    # Texte OCR aproape identice (un caracter citit greșit), găsite prin indexul de trigrame
+    texts = [key for key, i in first_with_key.items() if features[i]['text']]
+    for a, b in similarity.similar_text_pairs(texts, TEXT_MAX_EDIT_RATIO):
+        components.union(first_with_key[texts[a]], first_with_key[texts[b]])
+
+    # Aproape-duplicate găsite prin indexul BK-tree, fără comparații între toate perechile
+    pairs = similarity.near_duplicate_pairs([feat['hashes'] for feat in features],
+                                            PHASH_THRESHOLD, DHASH_THRESHOLD)
+    for i, j in pairs:
+        components.union(i, j)
+
+    members = defaultdict(list)
+    for i in range(len(filenames)):
+        members[components.find(i)].append(i)
+
+    # Grupa e numită după cheia cea mai frecventă dintre membri
+    text_groups = {}
+    for indices in members.values():
+        key_counts = defaultdict(int)
+        for i in indices:
+            key_counts[keys[i]] += 1
+        group_name = max(key_counts, key=key_counts.get)
+        text_groups[group_name] = [filenames[i] for i in indices]
+    return text_groups
 
 # === Salvare grupuri + copiere imagini + JSON ===
 
-sorted_groups = sorted(text_groups.items(), key=lambda x: len(x[1]), reverse=True)
-os.makedirs(output_base_folder, exist_ok=True)
-
-json_output = {}
-for idx, (group_name, files) in enumerate(sorted_groups, 1):
-    group_key = f"group_{idx:03}"
-    group_folder = os.path.join(output_base_folder, group_key)
-    os.makedirs(group_folder, exist_ok=True)
-
-    # Copiere imagini în folderul de grup
-    for f in files:
-        src = os.path.join(input_folder, f)
-        dst = os.path.join(group_folder, f)
-        shutil.copy2(src, dst)
-
-    # Scriere în JSON
-    json_output[group_key] = {
-        "based_on": group_name,
-        "images": files
-    }
-
-# Scriere JSON final
-os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
-with open(output_json_path, 'w', encoding='utf-8') as f:
-    json.dump(json_output, f, indent=2, ensure_ascii=False)
-
-print(f"\n✅ Gruparea a fost salvată în: {output_json_path}")
-print(f"🧠 OCR agresiv activat | 🎨 Toleranță culoare: {COLOR_TOLERANCE} | 🎯 Ignorare magenta: ON")
+def save_groups(text_groups, copy_images=True):
+    sorted_groups = sorted(text_groups.items(), key=lambda x: len(x[1]), reverse=True)
+    if copy_images:
+        os.makedirs(output_base_folder, exist_ok=True)
+
+    # Legătura fișier -> domenii, din manifestul extractorului
+    domains_by_stem = logo_store.domains_by_stem()
+
+    json_output = {}
+    for idx, (group_name, files) in enumerate(sorted_groups, 1):
+        group_key = f"group_{idx:03}"
+
+        # Copiere imagini în folderul de grup
+        if copy_images:
+            group_folder = os.path.join(output_base_folder, group_key)
+            os.makedirs(group_folder, exist_ok=True)
+            for f in files:
+                src = os.path.join(input_folder, f)
+                dst = os.path.join(group_folder, f)
+                shutil.copy2(src, dst)
+
+        # Scriere în JSON
+        json_output[group_key] = {
+            "based_on": group_name,
+            "images": files,
+            "domains": sorted({d for f in files for d in domains_by_stem.get(os.path.splitext(f)[0], [])})
+        }
+
+    # Scriere JSON final
+    os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
+    with open(output_json_path, 'w', encoding='utf-8') as f:
+        json.dump(json_output, f, indent=2, ensure_ascii=False)
+
+# === Procesare imagini ===
+
+if __name__ == '__main__':
+    filenames = sorted(f for f in os.listdir(input_folder) if f.lower().endswith('.png'))
+    paths = [os.path.join(input_folder, f) for f in filenames]
+
+    features = load_features(paths)
+    save_groups(group_logos(filenames, features))
+
+    print(f"\n✅ Gruparea a fost salvată în: {output_json_path}")
+    print(f"🧠 OCR agresiv activat | 🎨 Distanță culoare (Lab): {COLOR_DISTANCE} | 🎯 Ignorare magenta: ON"
+          f" | ⚙️ Procese OCR: {OCR_WORKERS} ({OCR_BACKEND})")
@@ -1,9 +1,55 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 import cairosvg
 
+from logo_store import svg_dimensions
 
-def convert_svg_to_png(input_dir: str, output_dir: str, scale: float = 2.0, fallback_size=(256, 256)):
+# Largest side of the rasterized logos, the size normalise.py scales them to anyway
+TARGET_SIZE = 256
+
+# Number of processes used for conversion (1 = serial)
+CONVERT_WORKERS = os.cpu_count() or 1
+
+
+def render_svg(svg_file, target_size=TARGET_SIZE, fallback_size=(256, 256)):
+    """Rasterize an SVG file straight at target_size and return the PNG bytes.
+    SVGs without a declared size are rendered at fallback_size."""
+    with open(svg_file, 'rb') as f:
+        width, height = svg_dimensions(f.read(2048))
+
+    if width and height:
+        try:
+            if width >= height:
+                return cairosvg.svg2png(url=str(svg_file), output_width=target_size)
+            return cairosvg.svg2png(url=str(svg_file), output_height=target_size)
+        except ValueError:
+            # "The SVG size is undefined": cairosvg could not resolve the size after all
+            pass
+    # Undefined SVG size: give cairosvg both dimensions
+    return cairosvg.svg2png(url=str(svg_file), output_width=fallback_size[0], output_height=fallback_size[1])
+
+
+def is_up_to_date(svg_file: Path, png_filename: Path):
+    """The PNG exists and is newer than its SVG"""
+    return png_filename.exists() and png_filename.stat().st_mtime >= svg_file.stat().st_mtime
+
+
+def convert_one(svg_file: Path, png_filename: Path, target_size=TARGET_SIZE, fallback_size=(256, 256)):
+    """Convert a single file, returning (error or None, elapsed milliseconds)"""
+    started = time.perf_counter()
+    try:
+        png_filename.write_bytes(render_svg(svg_file, target_size, fallback_size))
+        error = None
+    except Exception as e:
+        error = str(e)
+    return error, (time.perf_counter() - started) * 1000
+
+
+def convert_svg_to_png(input_dir: str, output_dir: str, target_size: int = TARGET_SIZE, fallback_size=(256, 256),
+                       workers: int = CONVERT_WORKERS, force: bool = False):
     # Convert the input and output paths to Path objects
     input_path = Path(input_dir)
     output_path = Path(output_dir)
@@ -11,34 +57,33 @@ def convert_svg_to_png(input_dir: str, output_dir: str, scale: float = 2.0, fall
     # Create the output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
 
-    # Iterate over all SVG files in the input directory
-    for svg_file in input_path.glob("*.svg"):
+    # Only convert SVG files whose PNG is missing or older than the SVG
+    jobs = []
+    skipped = 0
+    for svg_file in sorted(input_path.glob("*.svg")):
         png_filename = output_path / (svg_file.stem + ".png")
+        if not force and is_up_to_date(svg_file, png_filename):
+            skipped += 1
+            continue
+        jobs.append((svg_file, png_filename))
 
-        try:
-            # Attempt to convert SVG to PNG with the specified scale
-            cairosvg.svg2png(
-                url=str(svg_file),
-                write_to=str(png_filename),
-                scale=scale
-            )
-            print(f"Converted: {svg_file.name} → {png_filename.name}")
-        except Exception as e:
-            # Handle the case where SVG size is undefined
-            if "SVG size is undefined" in str(e):
-                try:
-                    # Retry conversion by setting a fallback output size
-                    cairosvg.svg2png(
-                        url=str(svg_file),
-                        write_to=str(png_filename),
-                        output_width=fallback_size[0],
-                        output_height=fallback_size[1]
-                    )
-                    print(f"Converted with fallback size: {svg_file.name} → {png_filename.name}")
-                except Exception as inner_e:
-                    print(f"Failed to convert {svg_file.name} even with fallback size: {inner_e}")
+    started = time.perf_counter()
+    args = ([svg_file for svg_file, _ in jobs], [png_filename for _, png_filename in jobs],
+            repeat(target_size), repeat(fallback_size))
+    # With a single worker everything runs in this process, no pool is started
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = executor.map(convert_one, *args) if executor else map(convert_one, *args)
+        for (svg_file, png_filename), (error, elapsed) in zip(jobs, results):
+            if error is None:
+                print(f"Converted: {svg_file.name} → {png_filename.name} ({elapsed:.1f} ms)")
             else:
-                print(f"Failed to convert {svg_file.name}: {e}")
+                print(f"Failed to convert {svg_file.name} ({elapsed:.1f} ms): {error}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    print(f"Converted {len(jobs)} SVG files in {time.perf_counter() - started:.2f} s, {skipped} already up to date")
 
 
 # Entry point of the script
@@ -46,6 +91,6 @@ if __name__ == "__main__":
     convert_svg_to_png(
         input_dir="../data/logos/svgs",
         output_dir="../data/logos/pngs",
-        scale=2.0,
+        target_size=TARGET_SIZE,
         fallback_size=(256, 256)
     )
@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+import time
+
+# Statuses a domain can end a crawl with
+STATUS_FOUND = 'found'
+STATUS_NOT_FOUND = 'not_found'
+
+# Description of the saved logo, kept in the same row so the Parquet manifest can
+# always be rebuilt from the journal, even after a crash
+LOGO_COLUMNS = {
+    'score': 'REAL',
+    'content_hash': 'TEXT',
+    'format': 'TEXT',
+    'byte_size': 'INTEGER',
+    'width': 'INTEGER',
+    'height': 'INTEGER',
+}
+
+# All workers share one connection, so every statement goes through this lock
+_lock = threading.Lock()
+
+
+def open_journal(path):
+    """Open (or create) the crawl journal at path"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS domains (
+            domain TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            method TEXT,
+            page_url TEXT,
+            source_url TEXT,
+            output_path TEXT,
+            elapsed REAL,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            updated_at REAL NOT NULL
+        )
+    """)
+    # Journals written before the logo columns existed get them added
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(domains)")}
+    for column, sql_type in LOGO_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE domains ADD COLUMN {column} {sql_type}")
+    conn.commit()
+    return conn
+
+
+def record_domain(conn, domain, status, method=None, page_url=None, source_url=None, output_path=None,
+                  elapsed=None, logo=None):
+    """Store the outcome of one domain, counting how many times it was attempted.
+    logo is the description of the saved logo (see LOGO_COLUMNS)."""
+    logo = logo or {}
+    columns = list(LOGO_COLUMNS)
+    with _lock:
+        conn.execute(f"""
+            INSERT INTO domains (domain, status, method, page_url, source_url, output_path, elapsed,
+                                 {', '.join(columns)}, updated_at)
+            VALUES ({', '.join('?' * (len(columns) + 8))})
+            ON CONFLICT(domain) DO UPDATE SET
+                status = excluded.status,
+                method = excluded.method,
+                page_url = excluded.page_url,
+                source_url = excluded.source_url,
+                output_path = excluded.output_path,
+                elapsed = excluded.elapsed,
+                {', '.join(f"{column} = excluded.{column}" for column in columns)},
+                attempts = domains.attempts + 1,
+                updated_at = excluded.updated_at
+        """, (domain, status, method, page_url, source_url, output_path, elapsed,
+              *(logo.get(column) for column in columns), time.time()))
+        conn.commit()
+
+
+def finished_domains(conn, retry_failed=False):
+    """Domains that must not be crawled again; failed ones are left out when retry_failed is set"""
+    query = "SELECT domain FROM domains"
+    if retry_failed:
+        query += f" WHERE status = '{STATUS_FOUND}'"
+    with _lock:
+        return {row[0] for row in conn.execute(query)}
+
+
+def journal_stats(conn, retry_failed=False):
+    """Seed values for the extractor stats, based on the domains that will be skipped"""
+    query = "SELECT status, COUNT(*) FROM domains"
+    if retry_failed:
+        query += f" WHERE status = '{STATUS_FOUND}'"
+    query += " GROUP BY status"
+    with _lock:
+        counts = dict(conn.execute(query).fetchall())
+    return {
+        'logo': counts.get(STATUS_FOUND, 0),
+        'website': sum(counts.values()),
+        'offline': counts.get(STATUS_NOT_FOUND, 0),
+    }
+
+
+def manifest_rows(conn):
+    """One manifest row per domain a logo was saved for"""
+    with _lock:
+        cursor = conn.execute(f"""
+            SELECT domain, source_url, method, {', '.join(LOGO_COLUMNS)}, output_path AS path
+            FROM domains WHERE status = '{STATUS_FOUND}' ORDER BY domain
+        """)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
@@ -1,17 +1,35 @@
 import os
+import json
 from urllib.parse import urljoin, urlparse
 import mimetypes
+import heapq
+from itertools import count, islice
 
 from bs4 import BeautifulSoup
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import pandas as pd
-import requests
 from seleniumwire import webdriver
+from seleniumwire.utils import decode as decode_body
 from selenium.common import TimeoutException
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 import re
+import logging
+from functools import lru_cache
+from types import SimpleNamespace
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+import crawl_journal
+import http_engine
+import logo_store
+import preflight
 
 # Define common browser headers to mimic a real browser request
 BROWSER_HEADERS = {
@@ -82,25 +100,184 @@ EXCLUDED_KEYWORDS = [
     'favicon'
 ]
 
-options = Options()
-# options.add_argument("--headless=new")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-gpu")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--blink-settings=imagesEnabled=false")
-options.add_argument(f"user-agent={BROWSER_HEADERS['User-Agent']}")
-options.page_load_strategy = 'eager'
-driver = webdriver.Chrome(options=options)
-driver.set_page_load_timeout(7)
-failed_websites = []
-
-os.makedirs("../data/logos", exist_ok=True)
-os.makedirs("../data/logos/pngs", exist_ok=True)
-os.makedirs("../data/logos/svgs", exist_ok=True)
-df = pd.read_parquet('../data/logos.snappy.parquet')
-img_src = ''
+# Keywords ignored for <link rel="apple-touch-icon"> style candidates
+ICON_KEYWORDS = ['icon', 'favicon']
+
+# Exclusion matchers, built once: a set for suffix lookups of the host and one
+# regex alternation over all keywords (with and without the icon keywords)
+EXCLUDED_DOMAIN_SET = frozenset(EXCLUDED_DOMAINS)
+EXCLUDED_KEYWORDS_RE = re.compile('|'.join(map(re.escape, EXCLUDED_KEYWORDS)))
+EXCLUDED_KEYWORDS_NO_ICONS_RE = re.compile(
+    '|'.join(re.escape(k) for k in EXCLUDED_KEYWORDS if k not in ICON_KEYWORDS))
+
+# Number of URL verdicts memoised by is_excluded_url
+URL_CACHE_SIZE = 65536
+
+# Skipped URLs are only logged at DEBUG level
+LOG_LEVEL = logging.INFO
+logger = logging.getLogger('extract_logos')
+
+# Minimum score a candidate found in static HTML needs before we trust it
+# instead of escalating to the Selenium finders
+STATIC_MIN_SCORE = 2
+
+# Number of best scored candidates downloaded concurrently before picking one
+CANDIDATE_BATCH_SIZE = 4
+
+# Score at which a browser candidate is tried right away, before the remaining
+# (more expensive) strategies run; e.g. the domain name and "logo" both in the URL
+HIGH_CONFIDENCE_SCORE = 6
+
+# Let Chrome load images so DOM logos can be served from the captured traffic
+# instead of being downloaded again (costs bandwidth on every page)
+LOAD_IMAGES_IN_BROWSER = False
+
+# Crawl journal used to resume interrupted runs; set RETRY_FAILED to crawl
+# again the domains where no logo was found
+JOURNAL_PATH = '../data/logos/crawl_journal.sqlite'
+RETRY_FAILED = False
+
+# Number of parallel browser workers; each one owns its own Chrome driver
+NUM_WORKERS = 4
+
+# Browser lifecycle: every worker's Chrome is restarted after RECYCLE_AFTER_PAGES domains or
+# once its processes use more than MAX_BROWSER_RSS_MB (needs psutil), and after a crash
+HEADLESS = True
+RECYCLE_AFTER_PAGES = 200
+MAX_BROWSER_RSS_MB = 1500
+CRASH_RETRIES = 1
+BROWSER_CRASH_MARKERS = ['invalid session id', 'session deleted', 'tab crashed', 'chrome not reachable',
+                         'disconnected', 'no such window', 'target window already closed',
+                         'max retries exceeded']
+
+# Probe DNS/TCP/TLS for all domains before the browsers start: unreachable domains are
+# journaled as not found right away and the others are opened on the scheme that answered
+PREFLIGHT = True
+
+# Request policy of the browser: fonts, media, trackers and the excluded hosts are
+# blocked by Chrome before they reach the Selenium Wire proxy, and the proxy only
+# records image-like requests. Set BLOCK_RESOURCES to False to load pages unchanged.
+BLOCK_RESOURCES = True
+BLOCKED_EXTENSIONS = ['woff', 'woff2', 'ttf', 'otf', 'eot', 'mp4', 'webm', 'ogg', 'ogv',
+                      'mp3', 'wav', 'm4a', 'avi', 'mov', 'm3u8']
+BLOCKED_HOSTS = EXCLUDED_DOMAINS + ['doubleclick.net', 'googlesyndication.com', 'adservice.google.com',
+                                    'segment.com', 'segment.io', 'mixpanel.com', 'newrelic.com',
+                                    'nr-data.net', 'clarity.ms', 'youtube.com', 'vimeo.com']
+CAPTURE_SCOPES = [r'(?i)\.(svg|png|jpe?g|gif|webp|avif|ico)(\?|#|$)', r'(?i)logo|brand']
+
+# Selenium Wire keeps at most this many requests per page in memory, and bodies
+# larger than MAX_CAPTURED_BODY_BYTES are dropped before they are stored (logos are far smaller)
+MAX_CAPTURED_REQUESTS = 500
+MAX_CAPTURED_BODY_BYTES = 2 * 1024 * 1024
+
+
+def blocked_url_patterns():
+    """URL patterns for Chrome's Network.setBlockedURLs ('*' matches anything)"""
+    patterns = [f"*.{extension}" for extension in BLOCKED_EXTENSIONS]
+    patterns += [f"*.{extension}?*" for extension in BLOCKED_EXTENSIONS]
+    for host in BLOCKED_HOSTS:
+        patterns += [f"*://{host}/*", f"*.{host}/*"]
+    return patterns
+
+
+def drop_large_body(request, response):
+    """Selenium Wire response interceptor: empty the bodies over MAX_CAPTURED_BODY_BYTES,
+    so the request storage never keeps them (only in-scope responses get here)"""
+    if len(response.body) > MAX_CAPTURED_BODY_BYTES:
+        response.body = b''
+        del response.headers['Content-Length']
+        response.headers['Content-Length'] = '0'
+
+
+def create_driver():
+    """Create a Chrome driver with its own Selenium Wire request buffer"""
+    options = Options()
+    if HEADLESS:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    if not LOAD_IMAGES_IN_BROWSER:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument(f"user-agent={BROWSER_HEADERS['User-Agent']}")
+    options.page_load_strategy = 'eager'
+    seleniumwire_options = {
+        'request_storage': 'memory',
+        'request_storage_max_size': MAX_CAPTURED_REQUESTS,
+    }
+    driver = webdriver.Chrome(options=options, seleniumwire_options=seleniumwire_options)
+    driver.set_page_load_timeout(7)
+    driver.response_interceptor = drop_large_body
+    if BLOCK_RESOURCES:
+        # Blocked requests fail inside the browser and never reach the proxy
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+        # Requests out of scope go through the proxy without being stored
+        driver.scopes = CAPTURE_SCOPES
+    return driver
+
+
+def is_browser_crash(error):
+    """True if error means the browser or its tab is gone, not just that a page failed"""
+    if isinstance(error, TimeoutException):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in BROWSER_CRASH_MARKERS)
+
+
+def restart_driver(driver):
+    """Quit driver (if it still answers) and return a fresh one"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    return create_driver()
+
+
+def browser_rss_mb(driver):
+    """Resident memory of chromedriver and every Chrome process it started, None without psutil"""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (psutil.Error, AttributeError):
+        return None
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss / (1024 * 1024)
+
+
+def should_recycle(driver, pages):
+    """True once the browser served enough pages or grew past the memory limit"""
+    if pages >= RECYCLE_AFTER_PAGES:
+        return True
+    rss = browser_rss_mb(driver)
+    return rss is not None and rss > MAX_BROWSER_RSS_MB
+
+
+def reset_driver_state(driver):
+    """Drop the cookies, storage and captured requests the last site left in the browser"""
+    try:
+        origin = driver.execute_script("return window.location.origin")
+        if origin and origin.startswith('http'):
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        # Leaving the page also stops its scripts and timers
+        driver.get('about:blank')
+    finally:
+        # Clear accumulated network requests to prevent memory leak
+        del driver.requests[:]
+
+
+# Stats are shared by all workers, so every update goes through this lock
+stats_lock = threading.Lock()
 stats = {
-    'logo': 3157,
+    'logo': 0,
     'website': 0,
     'offline': 0,
     'percentage': None
@@ -108,38 +285,50 @@ stats = {
 
 
 def stats_build(logo, website, offline, stats):
-    stats['logo'] += logo
-    stats['website'] += website
-    stats['offline'] += offline
-    if stats['website'] - stats['offline'] > 0:
-        stats['percentage'] = stats['logo'] / (stats['website'] - stats['offline']) * 100
-    else:
-        stats['percentage'] = 0.0
-    print("Logos extracted: " + str(stats['logo']) +
-          " | Websites checked: " + str(stats['website']) +
-          " | Offline websites: " + str(stats['offline']) +
-          " | Success percentage: {:.2f}%".format(stats['percentage']))
+    with stats_lock:
+        stats['logo'] += logo
+        stats['website'] += website
+        stats['offline'] += offline
+        if stats['website'] - stats['offline'] > 0:
+            stats['percentage'] = stats['logo'] / (stats['website'] - stats['offline']) * 100
+        else:
+            stats['percentage'] = 0.0
+        print("Logos extracted: " + str(stats['logo']) +
+              " | Websites checked: " + str(stats['website']) +
+              " | Offline websites: " + str(stats['offline']) +
+              " | Success percentage: {:.2f}%".format(stats['percentage']))
     return stats
 
 
-def is_excluded_url(url):
+def is_excluded_domain(domain):
+    """Check the host and each of its parent domains against the excluded set"""
+    labels = domain.split('.')
+    for i in range(len(labels) - 1):
+        if '.'.join(labels[i:]) in EXCLUDED_DOMAIN_SET:
+            return True
+    return False
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def is_excluded_url(url, allow_icons=False):
     """Check if URL should be excluded based on domain or keywords"""
     # Parse the URL to extract the domain
     parsed_url = urlparse(url)
-    domain = parsed_url.netloc.lower()
+    domain = (parsed_url.hostname or '').lower()
     path = parsed_url.path.lower()
 
-    # Check if the domain is in the excluded list
-    for excluded_domain in EXCLUDED_DOMAINS:
-        if excluded_domain in domain:
-            print(f"Skipping excluded domain: {domain} in {url}")
-            return True
+    # Check if the domain (or one of its parents) is in the excluded list
+    if is_excluded_domain(domain):
+        logger.debug("Skipping excluded domain: %s in %s", domain, url)
+        return True
 
-    # Check if the URL contains any excluded keywords
-    for keyword in EXCLUDED_KEYWORDS:
-        if keyword in path or keyword in domain:
-            print(f"Skipping URL with excluded keyword '{keyword}': {url}")
-            return True
+    # Check if the URL contains any excluded keywords, in a single regex pass;
+    # touch icons declared by the site itself are allowed to mention 'icon'
+    matcher = EXCLUDED_KEYWORDS_NO_ICONS_RE if allow_icons else EXCLUDED_KEYWORDS_RE
+    match = matcher.search(f"{domain} {path}")
+    if match:
+        logger.debug("Skipping URL with excluded keyword '%s': %s", match.group(0), url)
+        return True
 
     return False
 
@@ -151,19 +340,17 @@ def should_keep_image(url, size=None):
 
     # If we have size information, check dimensions
     if size and (size['width'] < 40 or size['height'] < 40):
-        print(f"Skipping small image ({size['width']}x{size['height']}): {url}")
-        return False
-
-    # If the URL looks like a favicon, skip it
-    if 'favicon' in url.lower():
+        logger.debug("Skipping small image (%sx%s): %s", size['width'], size['height'], url)
         return False
 
     return True
 
 
-def save_image(url, stats, response):
+def save_image(url, stats, response, domain, allow_icons=False):
+    """Save the image if the response holds a valid logo.
+    Returns the output path and the logo description for the manifest, or False."""
     # Check if the URL should be excluded
-    if is_excluded_url(url):
+    if is_excluded_url(url, allow_icons):
         return False
 
     # Check if the response is valid before saving
@@ -178,26 +365,23 @@ def save_image(url, stats, response):
         print(f"Error page detected in response from URL: {url}")
         return False
 
-    path = f"../data/logos/pngs/logo{stats['logo']}"
     if url.lower().endswith('.svg') or 'svg' in content_type or \
             '<svg' in response.content[:100].decode('utf-8', errors='ignore').lower():
-        path = f"../data/logos/svgs/logo{stats['logo']}"
-        with open(f"{path}.svg", "w", encoding="utf-8") as f:
-            f.write(response.text)
+        path, is_new = logo_store.store_logo(response.content, "../data/logos/svgs", "svg")
         stats_build(1, 0, 0, stats)
-        print(f"SVG salvat din URL-ul: {url}")
-        return True
+        print(f"SVG {'salvat' if is_new else 'deja existent'} din URL-ul: {url}")
+        return dict(logo_store.describe_logo(response.content, 'svg'), path=path)
 
     # For binary image formats like PNG, check content type
     if not ('image/png' in content_type or 'image/jpeg' in content_type or 'image/gif' in content_type):
         print(f"Invalid content type {content_type} for URL: {url}")
         return False
 
-    with open(f"{path}.png", "wb") as f:
-        f.write(response.content)
+    path, is_new = logo_store.store_logo(response.content, "../data/logos/pngs", "png")
     stats_build(1, 0, 0, stats)
-    print(f"PNG salvat din URL-ul: {url}")
-    return True
+    print(f"PNG {'salvat' if is_new else 'deja existent'} din URL-ul: {url}")
+    fmt = content_type.split('/')[-1].split(';')[0].strip()
+    return dict(logo_store.describe_logo(response.content, fmt), path=path)
 
 
 def analyze_image_relevance(url, domain, alt_text="", class_name="", parent_id=""):
@@ -246,500 +430,682 @@ def analyze_image_relevance(url, domain, alt_text="", class_name="", parent_id="
     return score
 
 
-def try_selenium_search_all_img_or_svg(driver, stats, response, domain):
-    """Look for logo images with priority given to those in header and with logo in class/id"""
-    all_candidates = []
-    current_domain = domain
-
-    # First, prioritize header logos
-    header_logo_elements = driver.find_elements(By.XPATH,
-                                                "//header//img[" +
-                                                "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                                " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                                "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                                " 'abcdefghijklmnopqrstuvwxyz'), 'logo')" +
-                                                "] | " +
-                                                "//nav//img[" +
-                                                "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                                " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                                "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                                " 'abcdefghijklmnopqrstuvwxyz'), 'logo')" +
-                                                "]")
-
-    # Then, find all potential logo elements
-    logo_elements = driver.find_elements(By.XPATH,
-                                         "//img[" +
-                                         "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@alt, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@src, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand') or " +
-                                         "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand') or " +
-                                         "contains(translate(@alt, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand') or " +
-                                         "contains(translate(@src, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand')" +
-                                         "] | " +
-                                         "//svg[" +
-                                         "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or " +
-                                         "contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand') or " +
-                                         "contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                         " 'abcdefghijklmnopqrstuvwxyz'), 'brand')" +
-                                         "]")
-
-    # Combine and prioritize header elements first
-    all_elements = list(header_logo_elements) + list(logo_elements)
-
-    for elem in all_elements:
-        try:
-            size = elem.size
-            tag_name = elem.tag_name
-
-            # Skip tiny images
-            if size['width'] < 40 or size['height'] < 40:
-                continue
-
-            if tag_name == 'img':
-                img_src = elem.get_attribute('src')
-                if not img_src:
-                    continue
-
-                img_src = urljoin(driver.current_url, img_src)
-                alt_text = elem.get_attribute('alt') or ""
-                class_name = elem.get_attribute('class') or ""
-
-                # Try to get parent element's id for context
-                parent_id = ""
-                try:
-                    parent = driver.execute_script("return arguments[0].parentNode;", elem)
-                    parent_id = parent.get_attribute('id') or ""
-                except:
-                    pass
+def svg_response_for(svg_content):
+    """Create a response-like object for inline SVG content"""
+    return SimpleNamespace(
+        status_code=200,
+        text=svg_content,
+        headers={'Content-Type': 'image/svg+xml'},
+        content=svg_content.encode('utf-8')
+    )
+
+
+# html.parser lowercases every tag and attribute name, but SVG names are case-sensitive
+# (a 'viewbox' is ignored by renderers); these are restored before an inline SVG is saved
+SVG_CAMEL_CASE_TAGS = [
+    'altGlyph', 'altGlyphDef', 'altGlyphItem', 'animateColor', 'animateMotion', 'animateTransform',
+    'clipPath', 'feBlend', 'feColorMatrix', 'feComponentTransfer', 'feComposite', 'feConvolveMatrix',
+    'feDiffuseLighting', 'feDisplacementMap', 'feDistantLight', 'feDropShadow', 'feFlood', 'feFuncA',
+    'feFuncB', 'feFuncG', 'feFuncR', 'feGaussianBlur', 'feImage', 'feMerge', 'feMergeNode',
+    'feMorphology', 'feOffset', 'fePointLight', 'feSpecularLighting', 'feSpotLight', 'feTile',
+    'feTurbulence', 'foreignObject', 'glyphRef', 'linearGradient', 'radialGradient', 'textPath',
+]
+SVG_CAMEL_CASE_ATTRIBUTES = [
+    'attributeName', 'attributeType', 'baseFrequency', 'baseProfile', 'calcMode', 'clipPathUnits',
+    'diffuseConstant', 'edgeMode', 'filterUnits', 'glyphRef', 'gradientTransform', 'gradientUnits',
+    'kernelMatrix', 'kernelUnitLength', 'keyPoints', 'keySplines', 'keyTimes', 'lengthAdjust',
+    'limitingConeAngle', 'markerHeight', 'markerUnits', 'markerWidth', 'maskContentUnits', 'maskUnits',
+    'numOctaves', 'pathLength', 'patternContentUnits', 'patternTransform', 'patternUnits', 'pointsAtX',
+    'pointsAtY', 'pointsAtZ', 'preserveAlpha', 'preserveAspectRatio', 'primitiveUnits', 'refX', 'refY',
+    'repeatCount', 'repeatDur', 'requiredExtensions', 'requiredFeatures', 'specularConstant',
+    'specularExponent', 'spreadMethod', 'startOffset', 'stdDeviation', 'stitchTiles', 'surfaceScale',
+    'systemLanguage', 'tableValues', 'targetX', 'targetY', 'textLength', 'viewBox', 'viewTarget',
+    'xChannelSelector', 'yChannelSelector', 'zoomAndPan',
+]
+SVG_TAG_CASE = {name.lower(): name for name in SVG_CAMEL_CASE_TAGS}
+SVG_ATTRIBUTE_CASE = {name.lower(): name for name in SVG_CAMEL_CASE_ATTRIBUTES}
 
-                # Skip if URL is in excluded list
-                if is_excluded_url(img_src):
-                    continue
 
-                # Calculate relevance score
-                score = analyze_image_relevance(img_src, current_domain, alt_text, class_name, parent_id)
+def svg_markup(svg):
+    """Serialize an <svg> parsed by html.parser with its camel-case names restored"""
+    for el in [svg] + svg.find_all(True):
+        el.name = SVG_TAG_CASE.get(el.name, el.name)
+        el.attrs = {SVG_ATTRIBUTE_CASE.get(name, name): value for name, value in el.attrs.items()}
+    return str(svg)
 
-                # Add to candidates
-                all_candidates.append({
-                    'url': img_src,
-                    'score': score,
-                    'size': size,
-                    'location': 'img_tag'
-                })
-
-            elif tag_name == 'svg':
-                # Handle SVG elements directly
-                svg_content = elem.get_attribute('outerHTML')
-                class_name = elem.get_attribute('class') or ""
-                elem_id = elem.get_attribute('id') or ""
-
-                # Calculate relevance score for SVG
-                score = 0
-                if 'logo' in class_name.lower() or 'logo' in elem_id.lower():
-                    score += 3
-                if 'brand' in class_name.lower() or 'brand' in elem_id.lower():
-                    score += 2
-
-                # Try to get parent element's id for context
-                parent_id = ""
-                try:
-                    parent = driver.execute_script("return arguments[0].parentNode;", elem)
-                    parent_id = parent.get_attribute('id') or ""
-                    if 'header' in parent_id.lower() or 'navbar' in parent_id.lower():
-                        score += 2
-                except:
-                    pass
-
-                all_candidates.append({
-                    'svg_content': svg_content,
-                    'score': score,
-                    'size': size,
-                    'location': 'svg_tag'
-                })
-        except Exception as e:
-            print(f"Error processing element: {e}")
 
+def captured_requests(driver):
+    """Index the requests Selenium Wire captured for the current page by URL"""
+    captured = {}
+    for request in driver.requests:
+        response = request.response
+        if not response or response.status_code != 200 or not response.body:
+            continue
+        # Backstop for drivers created without the drop_large_body interceptor
+        if len(response.body) > MAX_CAPTURED_BODY_BYTES:
+            continue
+        content_type = response.headers.get('Content-Type', '') or ''
+        if BLOCK_RESOURCES and content_type and not content_type.startswith('image/') \
+                and not re.search(CAPTURE_SCOPES[0], request.url):
+            continue
+        captured[request.url] = request
+    return captured
+
+
+def response_from_capture(request):
+    """Build a response-like object from a captured request, without touching the network"""
+    response = request.response
+    content = decode_body(response.body, response.headers.get('Content-Encoding', 'identity'))
+    return SimpleNamespace(
+        status_code=response.status_code,
+        text=content.decode('utf-8', errors='ignore'),
+        headers=response.headers,
+        content=content,
+        url=request.url
+    )
+
+
+def try_candidates(all_candidates, stats, domain, referer, label, top_k=CANDIDATE_BATCH_SIZE, captured=None):
+    """Download candidates best-first, top_k at a time, and save the first valid one.
+    URLs the browser already loaded are served from the captured traffic instead.
+    Returns the saved candidate merged with what save_image returned, or False."""
+    captured = captured or {}
     # Sort candidates by score (highest first)
-    all_candidates.sort(key=lambda x: x['score'], reverse=True)
+    all_candidates = sorted(all_candidates, key=lambda x: x['score'], reverse=True)
+
+    for start in range(0, len(all_candidates), top_k):
+        batch = all_candidates[start:start + top_k]
+
+        # Fetch every URL candidate of the batch that was not captured, concurrently
+        jobs = []
+        for candidate in batch:
+            if 'url' in candidate and candidate['url'] not in captured:
+                current_headers = BROWSER_HEADERS.copy()
+                current_headers['Referer'] = candidate.get('referer') or referer or candidate['url']
+                jobs.append((candidate['url'], current_headers))
+        responses = iter(http_engine.fetch_many(jobs))
+
+        # Then keep the best scored one that is actually a valid image
+        for candidate in batch:
+            try:
+                if 'url' in candidate:
+                    if candidate['url'] in captured:
+                        img_response = response_from_capture(captured[candidate['url']])
+                    else:
+                        img_response = next(responses)
+                    print(f"Trying {candidate.get('label', label)} with score {candidate['score']}: {candidate['url']}")
+                    if isinstance(img_response, Exception):
+                        print(f"Error fetching image from URL: {candidate['url']} | {img_response}")
+                        continue
+                    saved = save_image(candidate['url'], stats, img_response, domain,
+                                       candidate.get('allow_icons', False))
+                    if saved:
+                        return dict(candidate, **saved)
+                elif 'svg_content' in candidate:
+                    print(f"Trying SVG {candidate.get('label', label)} with score {candidate['score']}")
+                    saved = save_image('inline-svg', stats, svg_response_for(candidate['svg_content']), domain)
+                    if saved:
+                        return dict(candidate, **saved)
+            except Exception as e:
+                print(f"Error processing {label}: {e}")
+
+    return False
 
-    # Try the top candidates
-    for candidate in all_candidates:
-        try:
-            if 'url' in candidate:
-                try:
-                    # Add referer header based on the current page
-                    current_headers = BROWSER_HEADERS.copy()
-                    current_headers['Referer'] = driver.current_url
-                    img_response = requests.get(candidate['url'], headers=current_headers, timeout=5)
-
-                    print(f"Trying candidate with score {candidate['score']}: {candidate['url']}")
-                    if save_image(candidate['url'], stats, img_response):
-                        return True
-                except Exception as e:
-                    print(f"Error fetching image from URL: {candidate['url']} | {e}")
-            elif 'svg_content' in candidate:
-                # Create a response-like object for the SVG content
-                from types import SimpleNamespace
-                svg_response = SimpleNamespace(
-                    status_code=200,
-                    text=candidate['svg_content'],
-                    headers={'Content-Type': 'image/svg+xml'},
-                    content=candidate['svg_content'].encode('utf-8')
-                )
-
-                print(f"Trying SVG candidate with score {candidate['score']}")
-                if save_image('inline-svg', stats, svg_response):
-                    return True
-        except Exception as e:
-            print(f"Error processing candidate: {e}")
 
+def has_logo_marker(*values):
+    """Check if any of the given attribute values mentions logo or brand"""
+    for value in values:
+        if isinstance(value, list):
+            value = ' '.join(value)
+        if value and ('logo' in value.lower() or 'brand' in value.lower()):
+            return True
     return False
 
 
-def find_logo_in_tag_background(driver, stats, response, domain):
-    """Find logo in background images with priority scoring"""
+def find_logo_in_static_html(response, stats, domain, icon_candidates=None):
+    """Find logo in the already downloaded HTML, without a browser.
+    Touch icons are not tried here: they are appended to icon_candidates, to be tried
+    only if the browser finders come back empty."""
+    if response is None or response.status_code != 200:
+        return False
+    if 'html' not in response.headers.get('Content-Type', '').lower():
+        return False
+
     all_candidates = []
-    current_domain = domain
+    page_url = response.url
+    soup = BeautifulSoup(response.text, 'html.parser')
 
-    elements = driver.find_elements(By.CSS_SELECTOR, '*')
-    for el in elements:
-        try:
-            el_id = el.get_attribute('id') or ''
-            el_class = el.get_attribute('class') or ''
-
-            if ('logo' in el_id.lower() or 'logo' in el_class.lower() or
-                    'brand' in el_id.lower() or 'brand' in el_class.lower()):
-                bg_img = driver.execute_script(
-                    "return window.getComputedStyle(arguments[0]).getPropertyValue('background-image');", el)
-
-                if bg_img and bg_img != 'none':
-                    matches = re.findall(r'url\(["\']?(.*?)["\']?\)', bg_img)
-                    if matches:
-                        img_src = urljoin(driver.current_url, matches[0])
-
-                        # Skip if URL is in excluded list
-                        if is_excluded_url(img_src):
-                            continue
-
-                        # Calculate relevance score
-                        score = analyze_image_relevance(img_src, current_domain, "", el_class, el_id)
-
-                        # Get element size
-                        size = el.size
-
-                        # Add to candidates
-                        all_candidates.append({
-                            'url': img_src,
-                            'score': score,
-                            'size': size,
-                            'location': 'background'
-                        })
-        except:
+    # <img> tags with logo/brand attributes, either on the tag or on a close parent
+    for img in soup.find_all('img'):
+        img_src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+        if not img_src or img_src.startswith('data:'):
             continue
 
-    # Sort candidates by score (highest first)
-    all_candidates.sort(key=lambda x: x['score'], reverse=True)
+        alt_text = img.get('alt') or ""
+        class_name = ' '.join(img.get('class') or [])
+        parent = img.parent
+        parent_id = (parent.get('id') or "") if parent is not None else ""
+        # Only look at the closest few parents, page wrappers often carry 'brand' classes
+        in_logo_container = any(has_logo_marker(p.get('id'), p.get('class'))
+                                for p in islice(img.parents, 3) if p.name not in ('html', 'body'))
+        if not has_logo_marker(class_name, img.get('id'), alt_text, img_src) and not in_logo_container:
+            continue
 
-    # Try the top candidates
-    for candidate in all_candidates:
-        try:
-            # Add referer header based on the current page
-            current_headers = BROWSER_HEADERS.copy()
-            current_headers['Referer'] = driver.current_url
-
-            print(f"Trying background candidate with score {candidate['score']}: {candidate['url']}")
-            img_response = requests.get(candidate['url'], headers=current_headers, timeout=5)
-            if save_image(candidate['url'], stats, img_response):
-                return True
-        except Exception as e:
-            print(f"Error fetching background image from URL: {candidate['url']} | {e}")
+        img_src = urljoin(page_url, img_src)
+        if is_excluded_url(img_src):
+            continue
 
-    return False
+        score = analyze_image_relevance(img_src, domain, alt_text, class_name, parent_id)
+        if img.find_parent(['header', 'nav']):
+            score += 2
+        if in_logo_container:
+            score += 1
+        all_candidates.append({'url': img_src, 'score': score, 'location': 'static_img'})
+
+    # Open Graph images are sometimes the logo, trust them only when the URL path says so
+    # (most og:image are share banners hosted on the domain itself)
+    for prop in ['og:image', 'og:logo']:
+        for meta in soup.find_all('meta', attrs={'property': prop}):
+            content = meta.get('content')
+            if not content:
+                continue
+            img_src = urljoin(page_url, content)
+            if prop == 'og:image' and not has_logo_marker(urlparse(img_src).path):
+                continue
+            if is_excluded_url(img_src):
+                continue
+            score = analyze_image_relevance(img_src, domain)
+            all_candidates.append({'url': img_src, 'score': score, 'location': 'static_og_image'})
+
+    # Touch icons are square but usually large enough to be the brand mark. Self-hosted ones
+    # always get the domain-in-URL bonus, so they are kept as a last resort instead
+    links = soup.find_all('link', href=True) if icon_candidates is not None else []
+    for link in links:
+        rel = ' '.join(link.get('rel') or []).lower()
+        sizes = re.findall(r'(\d+)x\d+', (link.get('sizes') or '').lower())
+        is_large_icon = 'icon' in rel and sizes and max(int(s) for s in sizes) >= 96
+        if 'apple-touch-icon' not in rel and not is_large_icon:
+            continue
+        img_src = urljoin(page_url, link['href'])
+        if is_excluded_url(img_src, allow_icons=True):
+            continue
+        score = analyze_image_relevance(img_src, domain) + 1
+        icon_candidates.append({'url': img_src, 'score': score, 'location': 'static_link_icon',
+                                'referer': page_url, 'allow_icons': True})
+
+    # Inline SVG logos
+    for svg in soup.find_all('svg'):
+        class_name = ' '.join(svg.get('class') or [])
+        elem_id = svg.get('id') or ""
+        parent = svg.parent
+        parent_id = (parent.get('id') or "") if parent is not None else ""
+        parent_class = ' '.join(parent.get('class') or []) if parent is not None else ""
+
+        # Menu, search and cart icons also live in the header, so a marker is required
+        parent_marked = has_logo_marker(parent_id, parent_class)
+        if not parent_marked and not has_logo_marker(class_name, elem_id):
+            continue
 
+        score = svg_score(class_name, elem_id, parent_id)
+        if parent_marked:
+            score += 2
+        # svg_score only looks at the parent id, the SVG may still sit inside <header>/<nav>
+        if 'header' not in parent_id.lower() and 'navbar' not in parent_id.lower() and \
+                svg.find_parent(['header', 'nav']):
+            score += 2
+        all_candidates.append({'svg_content': svg_markup(svg), 'score': score, 'location': 'static_svg'})
+
+    # Only keep confident candidates, otherwise let the browser finders decide
+    all_candidates = [c for c in all_candidates if c['score'] >= STATIC_MIN_SCORE]
+    return try_candidates(all_candidates, stats, domain, page_url, 'static candidate')
+
+
+_MARKER_JS = """
+var hasMarker = function (value) {
+    value = (value || '').toLowerCase();
+    return value.indexOf('logo') !== -1 || value.indexOf('brand') !== -1;
+};
+var attr = function (el, name) { return el.getAttribute(name) || ''; };
+"""
+
+# Walks the DOM once inside the page and returns every img/svg element plus every
+# element with logo/brand in its id or class, so the finders need no extra round-trips
+COLLECT_ELEMENTS_JS = _MARKER_JS + """
+var records = [];
+var elements = document.querySelectorAll('*');
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    var tag = el.tagName.toLowerCase();
+    var id = attr(el, 'id');
+    var cls = attr(el, 'class');
+    var marked = hasMarker(id) || hasMarker(cls);
+    if (tag !== 'img' && tag !== 'svg' && !marked) continue;
+
+    var container = null;
+    for (var p = el.parentElement; p; p = p.parentElement) {
+        if (hasMarker(attr(p, 'id')) || hasMarker(attr(p, 'class'))) { container = p; break; }
+    }
+    var rect = el.getBoundingClientRect();
+    records.push({
+        tag: tag,
+        id: id,
+        cls: cls,
+        marked: marked,
+        alt: attr(el, 'alt'),
+        src: tag === 'img' ? (el.currentSrc || el.src || '') : '',
+        parent_id: el.parentElement ? attr(el.parentElement, 'id') : '',
+        in_header: !!el.closest('header, nav'),
+        container_id: container ? attr(container, 'id') : '',
+        container_class: container ? attr(container, 'class') : '',
+        in_container: !!container,
+        x: rect.x, y: rect.y, width: rect.width, height: rect.height,
+        outer_html: tag === 'svg' ? el.outerHTML : ''
+    });
+}
+return JSON.stringify(records);
+"""
+
+# Background images of the logo/brand elements; computing styles is the costly part
+# of the DOM walk, so it only runs when the background strategy is reached
+COLLECT_BACKGROUNDS_JS = _MARKER_JS + """
+var records = [];
+var elements = document.querySelectorAll('[id], [class]');
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    var id = attr(el, 'id');
+    var cls = attr(el, 'class');
+    if (!hasMarker(id) && !hasMarker(cls)) continue;
+    var background = window.getComputedStyle(el).getPropertyValue('background-image');
+    if (!background || background === 'none') continue;
+    var rect = el.getBoundingClientRect();
+    records.push({id: id, cls: cls, background: background, width: rect.width, height: rect.height});
+}
+return JSON.stringify(records);
+"""
 
-def find_logo_in_tag_children(driver, stats, response, domain):
-    """Find logo using Selenium with improved priority scoring"""
-    all_candidates = []
-    current_domain = domain
-
-    # Find potential logo containers first
-    elements = driver.find_elements(By.XPATH, "//*[contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                              " 'abcdefghijklmnopqrstuvwxyz'), 'logo') or"
-                                              " contains(translate(@class,"
-                                              " 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'logo')"
-                                              " or contains(translate(@id, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                              " 'abcdefghijklmnopqrstuvwxyz'), 'brand') or"
-                                              " contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-                                              " 'abcdefghijklmnopqrstuvwxyz'), 'brand')]")
 
-    for tag in elements:
-        try:
-            tag_id = tag.get_attribute('id') or ''
-            tag_class = tag.get_attribute('class') or ''
+def collect_page_elements(driver):
+    """Collect all logo candidate elements of the current page with a single script call"""
+    elements = json.loads(driver.execute_script(COLLECT_ELEMENTS_JS) or '[]')
+    for el in elements:
+        el['size'] = {'width': el['width'], 'height': el['height']}
+    return elements
 
-            if tag.tag_name == 'img':
-                img_src = tag.get_attribute('src')
-                if img_src:
-                    img_src = urljoin(driver.current_url, img_src)
 
-                    # Skip if URL is in excluded list
-                    if is_excluded_url(img_src):
-                        continue
+def svg_score(class_name, elem_id, parent_id=""):
+    """Relevance score for an inline SVG element"""
+    score = 0
+    if 'logo' in class_name.lower() or 'logo' in elem_id.lower():
+        score += 3
+    if 'brand' in class_name.lower() or 'brand' in elem_id.lower():
+        score += 2
+    if 'header' in parent_id.lower() or 'navbar' in parent_id.lower():
+        score += 2
+    return score
 
-                    # Get alt text
-                    alt_text = tag.get_attribute('alt') or ""
-
-                    # Calculate relevance score
-                    score = analyze_image_relevance(img_src, current_domain, alt_text, tag_class, tag_id)
-
-                    # Get size
-                    size = tag.size
-
-                    # Add to candidates
-                    all_candidates.append({
-                        'url': img_src,
-                        'score': score,
-                        'size': size,
-                        'location': 'img_in_logo_container'
-                    })
-            elif tag.tag_name == 'svg':
-                svg_content = tag.get_attribute('outerHTML')
-
-                # Calculate relevance score for SVG
-                score = 0
-                if 'logo' in tag_id.lower() or 'logo' in tag_class.lower():
-                    score += 3
-                if 'brand' in tag_id.lower() or 'brand' in tag_class.lower():
-                    score += 2
-
-                # Try to get parent context
-                parent_id = ""
-                try:
-                    parent = driver.execute_script("return arguments[0].parentNode;", tag)
-                    parent_id = parent.get_attribute('id') or ""
-                    if 'header' in parent_id.lower() or 'navbar' in parent_id.lower():
-                        score += 2
-                except:
-                    pass
-
-                # Get size
-                size = tag.size
-
-                # Add to candidates
-                all_candidates.append({
-                    'svg_content': svg_content,
-                    'score': score,
-                    'size': size,
-                    'location': 'svg_in_logo_container'
-                })
-            else:
-                # Try to find images inside this container
-                try:
-                    imgs = tag.find_elements(By.XPATH, ".//img | .//svg")
-                    for img in imgs:
-                        if img.tag_name == 'img':
-                            img_src = img.get_attribute('src')
-                            if img_src:
-                                img_src = urljoin(driver.current_url, img_src)
-
-                                # Skip if URL is in excluded list
-                                if is_excluded_url(img_src):
-                                    continue
-
-                                # Get alt text and class
-                                alt_text = img.get_attribute('alt') or ""
-                                img_class = img.get_attribute('class') or ""
-
-                                # Calculate relevance score
-                                score = analyze_image_relevance(img_src, current_domain, alt_text, img_class, tag_id)
-                                # Bonus for being inside a logo/brand container
-                                score += 1
-
-                                # Get size
-                                size = img.size
-
-                                # Add to candidates
-                                all_candidates.append({
-                                    'url': img_src,
-                                    'score': score,
-                                    'size': size,
-                                    'location': 'img_in_nested_container'
-                                })
-                        elif img.tag_name == 'svg':
-                            svg_content = img.get_attribute('outerHTML')
-
-                            # Calculate relevance score for SVG
-                            score = 0
-                            if 'logo' in tag_id.lower() or 'logo' in tag_class.lower():
-                                score += 3
-                            if 'brand' in tag_id.lower() or 'brand' in tag_class.lower():
-                                score += 2
-                            # Bonus for being inside a logo/brand container
-                            score += 1
-
-                            # Get size
-                            size = img.size
-
-                            # Add to candidates
-                            all_candidates.append({
-                                'svg_content': svg_content,
-                                'score': score,
-                                'size': size,
-                                'location': 'svg_in_nested_container'
-                            })
-                except Exception:
-                    pass
-        except Exception as e:
-            print(f"Error processing element: {e}")
 
-    # Sort candidates by score (highest first)
-    all_candidates.sort(key=lambda x: x['score'], reverse=True)
+def img_or_svg_candidates(page_url, domain, elements):
+    """Logo img/svg elements, header logos first; tiny ones are skipped"""
+    # First, prioritize header logos, then all potential logo elements
+    header_logo_elements = [el for el in elements
+                            if el['tag'] == 'img' and el['in_header'] and 'logo' in (el['id'] + ' ' + el['cls']).lower()]
+    logo_elements = [el for el in elements
+                     if (el['tag'] == 'img' and has_logo_marker(el['id'], el['cls'], el['alt'], el['src'])) or
+                     (el['tag'] == 'svg' and has_logo_marker(el['id'], el['cls']))]
+    all_elements = header_logo_elements + [el for el in logo_elements if el not in header_logo_elements]
 
-    # Try the top candidates
-    for candidate in all_candidates:
-        try:
-            if 'url' in candidate:
-                try:
-                    # Add referer header based on the current page
-                    current_headers = BROWSER_HEADERS.copy()
-                    current_headers['Referer'] = driver.current_url
-
-                    print(f"Trying child candidate with score {candidate['score']}: {candidate['url']}")
-                    img_response = requests.get(candidate['url'], headers=current_headers, timeout=5)
-                    if save_image(candidate['url'], stats, img_response):
-                        return True
-                except Exception as e:
-                    print(f"Error fetching nested image from URL: {candidate['url']} | {e}")
-            elif 'svg_content' in candidate:
-                # Create a response-like object for the SVG content
-                from types import SimpleNamespace
-                svg_response = SimpleNamespace(
-                    status_code=200,
-                    text=candidate['svg_content'],
-                    headers={'Content-Type': 'image/svg+xml'},
-                    content=candidate['svg_content'].encode('utf-8')
-                )
-
-                print(f"Trying SVG child candidate with score {candidate['score']}")
-                if save_image('inline-svg', stats, svg_response):
-                    return True
-        except Exception as e:
-            print(f"Error processing candidate: {e}")
+    for elem in all_elements:
+        size = elem['size']
 
-    return False
+        # Skip tiny images
+        if size['width'] < 40 or size['height'] < 40:
+            continue
 
+        if elem['tag'] == 'img':
+            if not elem['src']:
+                continue
+            img_src = urljoin(page_url, elem['src'])
 
-def find_logo_in_requests(driver, stats, response, domain):
-    """Find logo in network requests with better filtering"""
-    all_candidates = []
-    current_domain = domain
+            # Skip if URL is in excluded list
+            if is_excluded_url(img_src):
+                continue
 
-    for request in driver.requests:
-        if request.response:
-            url = request.url.lower()
+            # Calculate relevance score
+            score = analyze_image_relevance(img_src, domain, elem['alt'], elem['cls'], elem['parent_id'])
+            yield {
+                'url': img_src,
+                'score': score,
+                'size': size,
+                'location': 'img_tag'
+            }
+        else:
+            yield {
+                'svg_content': elem['outer_html'],
+                'score': svg_score(elem['cls'], elem['id'], elem['parent_id']),
+                'size': size,
+                'location': 'svg_tag'
+            }
+
+
+def tag_background_candidates(driver, page_url, domain):
+    """Background images of logo/brand elements. Computed styles are only read when
+    this strategy actually runs."""
+    backgrounds = json.loads(driver.execute_script(COLLECT_BACKGROUNDS_JS) or '[]')
+    for el in backgrounds:
+        matches = re.findall(r'url\(["\']?(.*?)["\']?\)', el['background'])
+        if matches:
+            img_src = urljoin(page_url, matches[0])
 
             # Skip if URL is in excluded list
-            if is_excluded_url(url):
+            if is_excluded_url(img_src):
                 continue
 
-            # Check if it looks like a logo image
-            if any(url.endswith(ext) for ext in ['.svg', '.png', '.jpg', '.jpeg']) and \
-                    any(keyword in url for keyword in ['logo', 'brand']):
-                # Calculate relevance score
-                score = analyze_image_relevance(url, current_domain)
+            # Calculate relevance score
+            score = analyze_image_relevance(img_src, domain, "", el['cls'], el['id'])
+            yield {
+                'url': img_src,
+                'score': score,
+                'size': {'width': el['width'], 'height': el['height']},
+                'location': 'background'
+            }
+
+
+def tag_children_candidates(page_url, domain, elements):
+    """img/svg elements that are, or sit inside, a logo/brand element"""
+    for tag in elements:
+        if tag['tag'] not in ('img', 'svg'):
+            continue
+
+        if tag['marked']:
+            # The image itself is the logo/brand element
+            if tag['tag'] == 'img':
+                if not tag['src']:
+                    continue
+                img_src = urljoin(page_url, tag['src'])
+
+                # Skip if URL is in excluded list
+                if is_excluded_url(img_src):
+                    continue
 
-                # Add to candidates
-                all_candidates.append({
-                    'url': url,
+                score = analyze_image_relevance(img_src, domain, tag['alt'], tag['cls'], tag['id'])
+                yield {
+                    'url': img_src,
                     'score': score,
-                    'location': 'network_request'
-                })
+                    'size': tag['size'],
+                    'location': 'img_in_logo_container'
+                }
+            else:
+                yield {
+                    'svg_content': tag['outer_html'],
+                    'score': svg_score(tag['cls'], tag['id'], tag['parent_id']),
+                    'size': tag['size'],
+                    'location': 'svg_in_logo_container'
+                }
+        elif tag['in_container']:
+            # Image nested inside a logo/brand container
+            if tag['tag'] == 'img':
+                if not tag['src']:
+                    continue
+                img_src = urljoin(page_url, tag['src'])
 
-    # Sort candidates by score (highest first)
-    all_candidates.sort(key=lambda x: x['score'], reverse=True)
+                # Skip if URL is in excluded list
+                if is_excluded_url(img_src):
+                    continue
 
-    # Try the top candidates
-    for candidate in all_candidates:
-        try:
-            # Add referer header based on the request URL's domain
-            current_headers = BROWSER_HEADERS.copy()
-            parsed_url = urlparse(candidate['url'])
-            current_headers['Referer'] = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-
-            print(f"Trying network request candidate with score {candidate['score']}: {candidate['url']}")
-            img_response = requests.get(candidate['url'], headers=current_headers, timeout=5)
-            if save_image(candidate['url'], stats, img_response):
-                return True
-        except Exception as e:
-            print(f"Error downloading from request URL: {candidate['url']} | {e}")
+                score = analyze_image_relevance(img_src, domain, tag['alt'], tag['cls'],
+                                                tag['container_id'])
+                # Bonus for being inside a logo/brand container
+                score += 1
+                yield {
+                    'url': img_src,
+                    'score': score,
+                    'size': tag['size'],
+                    'location': 'img_in_nested_container'
+                }
+            else:
+                # Bonus for being inside a logo/brand container
+                score = svg_score(tag['container_class'], tag['container_id']) + 1
+                yield {
+                    'svg_content': tag['outer_html'],
+                    'score': score,
+                    'size': tag['size'],
+                    'location': 'svg_in_nested_container'
+                }
 
-    return False
 
+def request_candidates(domain, captured):
+    """Logo-looking images among the requests the browser made"""
+    for original_url in captured:
+        url = original_url.lower()
 
-start_domain = 'aamcoredlandsca.com'
+        # Skip if URL is in excluded list
+        if is_excluded_url(url):
+            continue
 
-# Verificăm dacă domeniul există în dataframe
-if start_domain in df['domain'].values:
-    start_index = df[df['domain'] == start_domain].index[0]
-    domains_to_check = df.loc[start_index:, 'domain']
-else:
-    print(f"Domeniul {start_domain} nu a fost găsit în dataframe.")
-    domains_to_check = []
+        # Check if it looks like a logo image
+        if any(url.endswith(ext) for ext in ['.svg', '.png', '.jpg', '.jpeg']) and \
+                any(keyword in url for keyword in ['logo', 'brand']):
+            # Calculate relevance score
+            score = analyze_image_relevance(url, domain)
 
-for domain in domains_to_check:
+            # Add to candidates, keeping the original case of the URL for the lookup
+            # Add referer header based on the request URL's domain
+            parsed_url = urlparse(original_url)
+            yield {
+                'url': original_url,
+                'score': score,
+                'location': 'network_request',
+                'referer': f"{parsed_url.scheme}://{parsed_url.netloc}/"
+            }
+
+
+def candidate_key(candidate):
+    return candidate.get('url') or candidate.get('svg_content')
+
+
+def try_queued(queue, tried, stats, domain, referer, captured, min_score=None):
+    """Pop every queued candidate scoring at least min_score (all of them if None), best first,
+    and try them; candidates already tried through another strategy are skipped"""
+    batch = []
+    while queue and (min_score is None or -queue[0][0] >= min_score):
+        candidate = heapq.heappop(queue)[-1]
+        key = candidate_key(candidate)
+        if key in tried:
+            continue
+        tried.add(key)
+        batch.append(candidate)
+    return try_candidates(batch, stats, domain, referer, 'candidate', captured=captured)
+
+
+def find_logo_in_page(driver, stats, domain, captured, elements):
+    """Run the page strategies cheapest first, feeding their candidates lazily into one
+    priority queue. As soon as a candidate reaches HIGH_CONFIDENCE_SCORE the confident part
+    of the queue is tried, so later strategies only run while nothing convincing was found.
+    Returns the saved candidate (with the 'method' that produced it) or False."""
+    page_url = driver.current_url
+    strategies = [
+        ('img_or_svg', 'candidate', lambda: img_or_svg_candidates(page_url, domain, elements)),
+        ('tag_children', 'child candidate', lambda: tag_children_candidates(page_url, domain, elements)),
+        ('requests', 'network request candidate', lambda: request_candidates(domain, captured)),
+        ('tag_background', 'background candidate', lambda: tag_background_candidates(driver, page_url, domain)),
+    ]
+    queue = []
+    tried = set()
+    order = count()
+    for rank, (method, label, generate) in enumerate(strategies):
+        for candidate in generate():
+            candidate = dict(candidate, method=method, label=label)
+            # Ties on score keep the strategy order, then the order candidates were found in
+            heapq.heappush(queue, (-candidate['score'], rank, next(order), candidate))
+            if candidate['score'] >= HIGH_CONFIDENCE_SCORE:
+                found = try_queued(queue, tried, stats, domain, page_url, captured, HIGH_CONFIDENCE_SCORE)
+                if found:
+                    return found
+
+    return try_queued(queue, tried, stats, domain, page_url, captured)
+
+
+def page_urls(domain, target=None):
+    """URLs to try for a domain: the one that answered the pre-flight probe, else both protocols"""
+    if target and target.get('reachable'):
+        return [target['url']]
+    return [protocol + domain for protocol in ['https://', 'http://']]
+
+
+def process_domain(driver, domain, stats, journal=None, target=None):
+    """Try every protocol and finder on one domain until a logo is saved"""
     found = False
-    stats_build(0, 1, 0, stats)
-    for protocol in ['https://', 'http://']:
-        url = protocol + domain
+    icon_candidates = []
+    started = time.perf_counter()
+    # Connect timeout adapted by the pre-flight stage, the read timeout stays fixed
+    timeout = (target['timeout'], http_engine.DOWNLOAD_TIMEOUT) if target else http_engine.DOWNLOAD_TIMEOUT
+    for url in page_urls(domain, target):
         print(f"Încearcă {url}")
+        try:
+            response = http_engine.get(url, headers=BROWSER_HEADERS, timeout=timeout)
+        except Exception as e:
+            print(f"Eroare la cererea requests pentru {url}: {e}")
+            response = None
+
+        # Fast path: most sites serve their logo in the static markup
+        try:
+            found = find_logo_in_static_html(response, stats, domain, icon_candidates)
+            if found:
+                method = 'static_html'
+                break
+        except Exception as e:
+            print(f"Eroare la analiza HTML static pentru {url}: {e}")
+
         try:
             driver.get(url)
-            try:
-                response = requests.get(url, headers=BROWSER_HEADERS, timeout=5)
-            except Exception as e:
-                print(f"Eroare la cererea requests pentru {url}: {e}")
-                continue
 
             try:
-                if try_selenium_search_all_img_or_svg(driver, stats, response, domain):
-                    found = True
-                    break
-                elif find_logo_in_tag_background(driver, stats, response, domain):
-                    found = True
-                    break
-                elif find_logo_in_tag_children(driver, stats, response, domain):
-                    found = True
-                    break
-                elif find_logo_in_requests(driver, stats, response, domain):
-                    found = True
+                # Everything the browser already downloaded is reused by the finders
+                captured = captured_requests(driver)
+                # One script call gathers every DOM candidate for the element strategies
+                elements = collect_page_elements(driver)
+                found = find_logo_in_page(driver, stats, domain, captured, elements)
+                if found:
+                    method = found['method']
                     break
             except Exception as e:
+                if is_browser_crash(e):
+                    raise
                 print(f"Eroare la procesarea logo-urilor pentru {url}: {e}")
                 break
         except TimeoutException:
             print(f"Timeout la încărcarea site-ului: {url}")
         except Exception as e:
+            # A dead browser is restarted by the worker, which then retries the domain
+            if is_browser_crash(e):
+                raise
             print(f"Eroare la încărcarea site-ului {url}: {e}")
 
+    # Last resort: the touch icons declared in the static HTML
+    if not found and icon_candidates:
+        try:
+            found = try_candidates(icon_candidates, stats, domain, None, 'icon candidate')
+            method = 'static_link_icon'
+        except Exception as e:
+            print(f"Eroare la încercarea iconițelor pentru {domain}: {e}")
+
     if not found:
         stats_build(0, 0, 1, stats)
 
-    # Clear accumulated network requests to prevent memory leak
-    del driver.requests[:]
+    # The journal row is also the manifest row, committed as soon as the domain is done
+    if journal is not None:
+        elapsed = time.perf_counter() - started
+        if found:
+            crawl_journal.record_domain(journal, domain, crawl_journal.STATUS_FOUND, method, url,
+                                        found.get('url', 'inline-svg'), found['path'], elapsed, logo=found)
+        else:
+            crawl_journal.record_domain(journal, domain, crawl_journal.STATUS_NOT_FOUND, elapsed=elapsed)
+    return found
+
+
+def extract_worker(domains, stats, journal=None, targets=None):
+    """Run one shard of domains through a dedicated browser"""
+    targets = targets or {}
+    driver = create_driver()
+    pages = 0
+    try:
+        for domain in domains:
+            if should_recycle(driver, pages):
+                driver = restart_driver(driver)
+                pages = 0
+
+            stats_build(0, 1, 0, stats)
+            for attempt in range(CRASH_RETRIES + 1):
+                try:
+                    process_domain(driver, domain, stats, journal, targets.get(domain))
+                    break
+                except Exception as e:
+                    if not is_browser_crash(e):
+                        raise
+                    print(f"Browserul s-a oprit la {domain}, se repornește: {e}")
+                    driver = restart_driver(driver)
+                    pages = 0
+            else:
+                stats_build(0, 0, 1, stats)
+                if journal is not None:
+                    crawl_journal.record_domain(journal, domain, crawl_journal.STATUS_NOT_FOUND,
+                                                method='browser_crash')
+            pages += 1
+
+            try:
+                reset_driver_state(driver)
+            except Exception as e:
+                if not is_browser_crash(e):
+                    print(f"Eroare la curățarea browserului după {domain}: {e}")
+                driver = restart_driver(driver)
+                pages = 0
+    finally:
+        # Închide browserul
+        driver.quit()
+
+
+def run_workers(domains, stats, num_workers=NUM_WORKERS, journal=None, targets=None):
+    """Shard the domain list across num_workers browsers and wait for all of them"""
+    domains = list(domains)
+    num_workers = max(1, min(num_workers, len(domains)))
+    shards = [domains[i::num_workers] for i in range(num_workers)]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(extract_worker, shard, stats, journal, targets) for shard in shards]
+        for future in futures:
+            future.result()
+    return stats
+
 
-# Închide browserul
-driver.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=LOG_LEVEL, format='%(levelname)s %(message)s')
+    os.makedirs("../data/logos", exist_ok=True)
+    os.makedirs("../data/logos/pngs", exist_ok=True)
+    os.makedirs("../data/logos/svgs", exist_ok=True)
+    df = pd.read_parquet('../data/logos.snappy.parquet')
+
+    # Domains already in the journal are skipped, so an interrupted run resumes where it stopped
+    journal = crawl_journal.open_journal(JOURNAL_PATH)
+    # Rebuild the manifest first, in case the last run was killed before exporting it
+    logo_store.write_manifest(crawl_journal.manifest_rows(journal))
+    finished = crawl_journal.finished_domains(journal, retry_failed=RETRY_FAILED)
+    stats.update(crawl_journal.journal_stats(journal, retry_failed=RETRY_FAILED))
+    domains_to_check = [domain for domain in df['domain'] if domain not in finished]
+    print(f"Domenii rămase: {len(domains_to_check)} | Deja procesate: {len(finished)}")
+
+    try:
+        targets = {}
+        if PREFLIGHT and len(domains_to_check):
+            targets = preflight.check_domains(domains_to_check)
+            unreachable = [domain for domain in domains_to_check if not targets[domain]['reachable']]
+            for domain in unreachable:
+                crawl_journal.record_domain(journal, domain, crawl_journal.STATUS_NOT_FOUND,
+                                            method=f"preflight_{targets[domain]['error']}",
+                                            elapsed=targets[domain]['elapsed'])
+            stats_build(0, len(unreachable), len(unreachable), stats)
+            domains_to_check = [domain for domain in domains_to_check if targets[domain]['reachable']]
+
+        if len(domains_to_check):
+            run_workers(domains_to_check, stats, journal=journal, targets=targets)
+    finally:
+        logo_store.write_manifest(crawl_journal.manifest_rows(journal))
+        journal.close()
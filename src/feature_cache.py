@@ -0,0 +1,63 @@
+import hashlib
+import json
+import sqlite3
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a file's bytes"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def config_fingerprint(config):
+    """Short stable key for the preprocessing/OCR settings the features depend on"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def open_cache(path):
+    """Open (or create) the feature cache at path"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS features (
+            content_hash TEXT NOT NULL,
+            config TEXT NOT NULL,
+            features TEXT NOT NULL,
+            PRIMARY KEY (content_hash, config)
+        )
+    """)
+    conn.commit()
+    return conn
+
+
+def get_features(conn, hashes, config):
+    """Cached features for the given content hashes, as {hash: features}"""
+    found = {}
+    hashes = list(set(hashes))
+    # Stay below SQLite's limit on bound parameters
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rows = conn.execute(
+            f"SELECT content_hash, features FROM features WHERE config = ? AND content_hash IN ({placeholders})",
+            [config] + chunk)
+        for content_hash, features in rows:
+            found[content_hash] = json.loads(features)
+    return found
+
+
+def put_features(conn, items, config):
+    """Store {hash: features} computed with config"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO features (content_hash, config, features) VALUES (?, ?, ?)",
+        [(content_hash, config, json.dumps(features)) for content_hash, features in items.items()])
+    conn.commit()
+
+
+def evict_missing(conn, live_hashes):
+    """Drop entries whose source image no longer exists; returns how many were removed"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (content_hash TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM live")
+    conn.executemany("INSERT OR IGNORE INTO live VALUES (?)", [(h,) for h in live_hashes])
+    removed = conn.execute("DELETE FROM features WHERE content_hash NOT IN (SELECT content_hash FROM live)").rowcount
+    conn.commit()
+    return removed
@@ -5,6 +5,8 @@ import shutil
 # Paths to input/output directories and files
 json_path = '../data/logos/groups.json'
 input_images_folder = '../data/logos/pngs'
+# The streaming pipeline only writes normalised images, so fall back to them
+fallback_images_folder = '../data/logos/normalised'
 output_site_folder = './output_site'
 images_output_folder = os.path.join(output_site_folder, 'images')
 
@@ -21,6 +23,8 @@ for group in groups.values():
     for img in group["images"]:
         if img not in copied:
             src = os.path.join(input_images_folder, img)
+            if not os.path.exists(src):
+                src = os.path.join(fallback_images_folder, img)
             dst = os.path.join(images_output_folder, img)
             shutil.copy2(src, dst)
             copied.add(img)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Maximum number of downloads in flight across all workers
+GLOBAL_CONCURRENCY = 32
+
+# Maximum number of downloads in flight against a single host
+PER_HOST_CONCURRENCY = 4
+
+# Number of hosts whose connection pools are kept alive at the same time
+POOLED_HOSTS = 256
+
+# Number of hosts whose concurrency limit is remembered; the least recently used
+# idle hosts are forgotten beyond that, so long crawls keep a bounded table
+TRACKED_HOSTS = 1024
+
+DOWNLOAD_TIMEOUT = 5
+
+# The executor size is the global concurrency limit, every download runs on it
+_executor = ThreadPoolExecutor(max_workers=GLOBAL_CONCURRENCY, thread_name_prefix='download')
+
+_session = None
+_session_lock = threading.Lock()
+# host -> [semaphore, number of threads using it], in least recently used order
+_host_slots = OrderedDict()
+_host_slots_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared session, keeping one keep-alive connection pool per host"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOLED_HOSTS, pool_maxsize=PER_HOST_CONCURRENCY)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _evict_idle_hosts():
+    """Forget the least recently used hosts nobody is downloading from (lock must be held)"""
+    excess = len(_host_slots) - TRACKED_HOSTS + 1
+    if excess <= 0:
+        return
+    idle = [host for host, (_, users) in _host_slots.items() if users == 0]
+    for host in idle[:excess]:
+        del _host_slots[host]
+
+
+@contextmanager
+def _host_slot(url):
+    """Hold one of the PER_HOST_CONCURRENCY download slots of the host of url"""
+    host = urlparse(url).netloc.lower()
+    with _host_slots_lock:
+        entry = _host_slots.get(host)
+        if entry is None:
+            _evict_idle_hosts()
+            entry = _host_slots[host] = [threading.BoundedSemaphore(PER_HOST_CONCURRENCY), 0]
+        _host_slots.move_to_end(host)
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _host_slots_lock:
+            entry[1] -= 1
+
+
+def get(url, headers=None, timeout=DOWNLOAD_TIMEOUT):
+    """Blocking GET through the shared pooled session"""
+    with _host_slot(url):
+        return get_session().get(url, headers=headers, timeout=timeout)
+
+
+async def fetch(url, headers=None, timeout=DOWNLOAD_TIMEOUT):
+    """Download url without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, get, url, headers, timeout)
+
+
+async def fetch_all(jobs, timeout=DOWNLOAD_TIMEOUT):
+    """Download every (url, headers) job concurrently, exceptions are returned in place"""
+    return await asyncio.gather(*(fetch(url, headers, timeout) for url, headers in jobs),
+                                return_exceptions=True)
+
+
+def fetch_many(jobs, timeout=DOWNLOAD_TIMEOUT):
+    """Synchronous entry point for fetch_all, results keep the order of jobs"""
+    if not jobs:
+        return []
+    return asyncio.run(fetch_all(jobs, timeout))
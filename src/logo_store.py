@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+import threading
+from io import BytesIO
+
+import pandas as pd
+from PIL import Image
+
+# Columnar manifest mapping every saved logo back to its domain, exported from the crawl journal
+MANIFEST_DIR = '../data/logos/manifest'
+MANIFEST_FILE = 'manifest.parquet'
+MANIFEST_COLUMNS = ['domain', 'source_url', 'method', 'score', 'content_hash', 'format',
+                    'byte_size', 'width', 'height', 'path']
+
+# Logos are stored under the first characters of their content hash, so the
+# same bytes served by many domains are written (and processed later) once
+HASH_NAME_LENGTH = 16
+
+def content_hash(content):
+    """SHA-256 hex digest of the raw image bytes"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def svg_dimensions(content):
+    """Read width/height from the root <svg> tag, falling back to the viewBox.
+    Only unitless or px sizes count; '100%' or '2em' depend on where the SVG is shown."""
+    head = content[:2048].decode('utf-8', errors='ignore')
+    match = re.search(r'<svg\b[^>]*>', head, re.IGNORECASE | re.DOTALL)
+    if not match:
+        return None, None
+    tag = match.group(0)
+    width = re.search(r'(?<![\w-])width=["\']\s*([\d.]+)\s*(?:px)?\s*["\']', tag)
+    height = re.search(r'(?<![\w-])height=["\']\s*([\d.]+)\s*(?:px)?\s*["\']', tag)
+    if width and height:
+        return int(float(width.group(1))), int(float(height.group(1)))
+    view_box = re.search(r'viewBox=["\']\s*[-\d.]+[\s,]+[-\d.]+[\s,]+([\d.]+)[\s,]+([\d.]+)', tag)
+    if view_box:
+        return int(float(view_box.group(1))), int(float(view_box.group(2)))
+    return None, None
+
+
+def describe_logo(content, fmt):
+    """Hash, size and dimensions of a logo about to be saved"""
+    if fmt == 'svg':
+        width, height = svg_dimensions(content)
+    else:
+        try:
+            with Image.open(BytesIO(content)) as img:
+                width, height = img.size
+        except Exception:
+            width, height = None, None
+    return {
+        'content_hash': content_hash(content),
+        'format': fmt,
+        'byte_size': len(content),
+        'width': width,
+        'height': height,
+    }
+
+
+def store_logo(content, folder, extension):
+    """Write content under its hash name unless an identical logo is already stored.
+    Returns the path and whether the file was newly written."""
+    name = content_hash(content)[:HASH_NAME_LENGTH]
+    path = os.path.join(folder, f"{name}.{extension}")
+    if os.path.exists(path):
+        return path, False
+
+    # Write to a temporary file first, workers may store the same logo concurrently
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return path, True
+
+
+def write_manifest(rows, manifest_dir=MANIFEST_DIR):
+    """Write the whole manifest as one Parquet file, replacing the previous one atomically.
+    The rows come from the crawl journal, which is the durable record of every saved logo."""
+    os.makedirs(manifest_dir, exist_ok=True)
+    df = pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+    df = df.astype({'width': 'Int64', 'height': 'Int64', 'byte_size': 'Int64', 'score': 'float64'})
+    # Hidden temporary name, so readers of the dataset never pick up a half-written file
+    tmp_path = os.path.join(manifest_dir, f".{MANIFEST_FILE}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(manifest_dir, MANIFEST_FILE))
+    # Part files from older runs are superseded by the rebuilt manifest
+    for name in os.listdir(manifest_dir):
+        if name.endswith('.parquet') and name != MANIFEST_FILE:
+            os.remove(os.path.join(manifest_dir, name))
+    return len(df)
+
+
+def read_manifest(manifest_dir=MANIFEST_DIR, columns=None):
+    """Read the manifest dataset, or an empty frame if nothing was extracted yet"""
+    if not os.path.isdir(manifest_dir) or not any(f.endswith('.parquet') for f in os.listdir(manifest_dir)):
+        return pd.DataFrame(columns=columns or MANIFEST_COLUMNS)
+    return pd.read_parquet(manifest_dir, columns=columns)
+
+
+def domains_by_stem(manifest_dir=MANIFEST_DIR):
+    """Map each saved file name (without extension) to the domains it was extracted from"""
+    manifest = read_manifest(manifest_dir, columns=['domain', 'path'])
+    mapping = {}
+    for domain, path in zip(manifest['domain'], manifest['path']):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        mapping.setdefault(stem, [])
+        if domain not in mapping[stem]:
+            mapping[stem].append(domain)
+    return mapping
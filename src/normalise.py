@@ -1,5 +1,10 @@
 
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
 from PIL import Image
 
 # Input and output folders
@@ -12,31 +17,167 @@ target_size = (256, 256)
 # Rare background color (used to detect background easily if needed later)
 bg_color = (255, 0, 255)
 
-# Create the output directory if it doesn't exist
-os.makedirs(output_folder, exist_ok=True)
+# Number of processes used for normalisation (1 = serial)
+NORMALISE_WORKERS = os.cpu_count() or 1
 
-# Process each PNG file in the input directory
-for filename in os.listdir(input_folder):
-    if filename.lower().endswith('.png'):
-        input_path = os.path.join(input_folder, filename)
-        output_path = os.path.join(output_folder, filename)
+# PNG zlib level of the outputs (0 = uncompressed); they are intermediates, so
+# encoding speed matters more than file size
+COMPRESS_LEVEL = 1
 
-        with Image.open(input_path) as img:
-            # Ensure the image is in RGBA mode to support transparency
-            img = img.convert('RGBA')
+# Optional contiguous (N, 256, 256, 3) uint8 copy of all normalised logos, with
+# an index mapping rows to file names, read zero-copy through a memmap
+WRITE_TENSOR_STORE = True
+tensor_path = '../data/logos/normalised.npy'
+tensor_index_path = '../data/logos/normalised_index.json'
 
-            # Resize the image while maintaining aspect ratio
-            img.thumbnail(target_size, Image.Resampling.LANCZOS)
+# Large sources are first shrunk with the fast integer reduce() until they are
+# at most this many times the target size, LANCZOS only does the last step
+REDUCING_GAP = 2.0
 
-            # Create a new image with the target size and background color
-            background = Image.new('RGB', target_size, bg_color)
 
-            # Center the resized image on the background
-            x = (target_size[0] - img.width) // 2
-            y = (target_size[1] - img.height) // 2
-            background.paste(img, (x, y), img)
+def open_for_target(path):
+    """Open an image, letting JPEG sources decode directly at a reduced scale"""
+    img = Image.open(path)
+    # Logos saved with a .png name can hold JPEG data; draft() makes the decoder downscale
+    if img.format == 'JPEG':
+        img.draft('RGB', (target_size[0] * 2, target_size[1] * 2))
+    return img
 
+
+def normalise_image(img):
+    """Fit an image inside target_size and center it on the background color"""
+    # Ensure the image is in RGBA mode to support transparency
+    img = img.convert('RGBA')
+
+    # Resize the image while maintaining aspect ratio
+    img.thumbnail(target_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    # Create a new image with the target size and background color
+    background = Image.new('RGB', target_size, bg_color)
+
+    # Center the resized image on the background
+    x = (target_size[0] - img.width) // 2
+    y = (target_size[1] - img.height) // 2
+    background.paste(img, (x, y), img)
+    return background
+
+
+def is_up_to_date(input_path, output_path):
+    """The output exists and is newer than its source"""
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+
+def normalise_file(input_path, output_path, compress_level=COMPRESS_LEVEL):
+    """Normalise one image, returning the error message or None"""
+    try:
+        with open_for_target(input_path) as img:
             # Save the final image
-            background.save(output_path, 'PNG')
+            normalise_image(img).save(output_path, 'PNG', compress_level=compress_level)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def normalise_logos(input_folder=input_folder, output_folder=output_folder, workers=NORMALISE_WORKERS,
+                    compress_level=COMPRESS_LEVEL, force=False):
+    """Normalise every PNG of input_folder that changed since its last normalisation"""
+    # Create the output directory if it doesn't exist
+    os.makedirs(output_folder, exist_ok=True)
+
+    jobs = []
+    skipped = 0
+    for filename in sorted(os.listdir(input_folder)):
+        if filename.lower().endswith('.png'):
+            input_path = os.path.join(input_folder, filename)
+            output_path = os.path.join(output_folder, filename)
+            if not force and is_up_to_date(input_path, output_path):
+                skipped += 1
+                continue
+            jobs.append((input_path, output_path))
+
+    started = time.perf_counter()
+    args = ([input_path for input_path, _ in jobs], [output_path for _, output_path in jobs],
+            repeat(compress_level))
+    # With a single worker everything runs in this process, no pool is started
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = executor.map(normalise_file, *args) if executor else map(normalise_file, *args)
+        for (input_path, _), error in zip(jobs, results):
+            if error is not None:
+                print(f"Failed to normalise {os.path.basename(input_path)}: {error}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    print(f"Normalised {len(jobs)} images in {time.perf_counter() - started:.2f} s, {skipped} already up to date")
+
+
+def file_signature(path):
+    """What must stay unchanged for a stored row to still match its file"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def build_tensor_store(folder=output_folder, tensor_path=tensor_path, index_path=tensor_index_path):
+    """Write every normalised logo of folder into one memory-mappable .npy file.
+    Rows of files unchanged since the previous store are copied instead of decoded again."""
+    filenames = sorted(f for f in os.listdir(folder) if f.lower().endswith('.png'))
+    files = {filename: [row] + file_signature(os.path.join(folder, filename))
+             for row, filename in enumerate(filenames)}
+    previous = open_tensor_store(tensor_path, index_path)
+    if previous is not None and previous[1] == files:
+        print(f"Tensor store: {len(filenames)} rows already up to date in {tensor_path}")
+        return
+
+    tmp_path = tensor_path + '.tmp.npy'
+    tensor = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                       shape=(len(filenames), target_size[1], target_size[0], 3))
+    reused = 0
+    for filename, (row, *signature) in files.items():
+        old_row = tensor_row(previous, filename, signature)
+        if old_row is not None:
+            tensor[row] = previous[0][old_row]
+            reused += 1
+        else:
+            with Image.open(os.path.join(folder, filename)) as img:
+                tensor[row] = np.asarray(img.convert('RGB').resize(target_size))
+    tensor.flush()
+    del tensor, previous
+
+    tmp_index_path = index_path + '.tmp'
+    with open(tmp_index_path, 'w', encoding='utf-8') as f:
+        json.dump({'shape': [len(filenames), target_size[1], target_size[0], 3], 'files': files}, f)
+    # Drop the old index first: if we stop between the two renames there is no index,
+    # so the store is rebuilt instead of pairing the new tensor with stale row numbers
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    os.replace(tmp_path, tensor_path)
+    os.replace(tmp_index_path, index_path)
+    print(f"Tensor store: {len(filenames)} rows ({reused} reused) in {tensor_path}")
+
+
+def open_tensor_store(tensor_path=tensor_path, index_path=tensor_index_path):
+    """Memory-map the tensor store read-only, returning (tensor, index) or None if there is none"""
+    if not os.path.exists(tensor_path) or not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    tensor = np.load(tensor_path, mmap_mode='r')
+    if list(tensor.shape) != index['shape']:
+        return None
+    return tensor, index['files']
+
+
+def tensor_row(store, filename, signature):
+    """Row of filename in the store, or None when it is missing or the file changed since"""
+    if store is None or filename not in store[1]:
+        return None
+    row, *stored_signature = store[1][filename]
+    return row if stored_signature == signature else None
+
 
-print("All images resized and centered on background.")
\ No newline at end of file
+if __name__ == "__main__":
+    normalise_logos()
+    if WRITE_TENSOR_STORE:
+        build_tensor_store()
+    print("All images resized and centered on background.")
@@ -0,0 +1,92 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import color_features
+import compare
+from convertToPNG import render_svg
+from normalise import COMPRESS_LEVEL, normalise_image, open_for_target
+
+# Extracted logos (inputs) and the only image artifacts the pipeline writes
+svg_folder = '../data/logos/svgs'
+png_folder = '../data/logos/pngs'
+output_folder = '../data/logos/normalised'
+
+# Number of processes running the fused stages
+PIPELINE_WORKERS = os.cpu_count() or 1
+
+# Maximum number of logos in flight between the reader, the workers and the grouping stage
+QUEUE_SIZE = PIPELINE_WORKERS * 4
+
+
+def process_logo(source_path):
+    """SVG rasterization -> normalisation on the magenta canvas -> OCR/color/hash features,
+    all in memory. Only the normalised PNG is written to disk."""
+    if source_path.lower().endswith('.svg'):
+        img = Image.open(BytesIO(render_svg(source_path)))
+    else:
+        img = open_for_target(source_path)
+    with img:
+        normalised = normalise_image(img)
+
+    filename = os.path.splitext(os.path.basename(source_path))[0] + '.png'
+    normalised.save(os.path.join(output_folder, filename), 'PNG', compress_level=COMPRESS_LEVEL)
+
+    features = compare.image_features(normalised)
+    features.update(color_features.stack_color_features(np.asarray(normalised)[None])[0])
+    return filename, features
+
+
+def try_process_logo(source_path):
+    """process_logo that reports failures instead of stopping the stream"""
+    try:
+        return process_logo(source_path)
+    except Exception as e:
+        print(f"Failed to process {source_path}: {e}")
+        return None
+
+
+def stream_map(func, items, workers=PIPELINE_WORKERS, queue_size=QUEUE_SIZE):
+    """Like executor.map, but never holds more than queue_size pending items, so reading,
+    processing and consuming results overlap with bounded memory. Results keep input order."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= queue_size:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def source_logos():
+    """Every extracted logo; SVGs take precedence over a PNG already converted from them"""
+    sources = {}
+    for folder, extension in [(png_folder, '.png'), (svg_folder, '.svg')]:
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(extension):
+                sources[os.path.splitext(filename)[0]] = os.path.join(folder, filename)
+    return [sources[stem] for stem in sorted(sources)]
+
+
+if __name__ == "__main__":
+    os.makedirs(output_folder, exist_ok=True)
+
+    filenames = []
+    features = []
+    for result in stream_map(try_process_logo, source_logos()):
+        if result is None:
+            continue
+        filename, feat = result
+        filenames.append(filename)
+        features.append(feat)
+
+    # Grouping needs every feature, so it is the only stage that waits for the whole stream
+    compare.save_groups(compare.group_logos(filenames, features), copy_images=False)
+    print(f"Pipeline finished: {len(filenames)} logos grouped, groups saved in {compare.output_json_path}")
@@ -0,0 +1,167 @@
+import asyncio
+import socket
+import ssl
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+# Number of domains probed at the same time (DNS lookups run on a pool of this size)
+PREFLIGHT_CONCURRENCY = 200
+
+# Timeout of the first probes, before enough latencies were observed to adapt it
+INITIAL_TIMEOUT = 4.0
+
+# Once MIN_SAMPLES connections succeeded, probes time out after TIMEOUT_FACTOR times the
+# LATENCY_PERCENTILE of the observed latencies, clamped to [MIN_TIMEOUT, MAX_TIMEOUT]
+LATENCY_PERCENTILE = 95
+TIMEOUT_FACTOR = 2.0
+MIN_TIMEOUT = 1.0
+MAX_TIMEOUT = 7.0
+MIN_SAMPLES = 20
+
+# The percentile is taken over the last LATENCY_WINDOW latencies and only recomputed
+# every RECOMPUTE_EVERY new samples, so probes never wait on a large sort
+LATENCY_WINDOW = 2000
+RECOMPUTE_EVERY = 50
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
+
+
+def percentile(values, p):
+    """p-th percentile of values (nearest rank)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def adaptive_timeout(latencies):
+    """Probe timeout derived from the connection latencies observed so far"""
+    if len(latencies) < MIN_SAMPLES:
+        return INITIAL_TIMEOUT
+    timeout = percentile(latencies, LATENCY_PERCENTILE) * TIMEOUT_FACTOR
+    return min(MAX_TIMEOUT, max(MIN_TIMEOUT, timeout))
+
+
+class LatencyTracker:
+    """Recent connection latencies and the probe timeout derived from them"""
+
+    def __init__(self):
+        self.window = deque(maxlen=LATENCY_WINDOW)
+        self.count = 0
+        self.timeout = INITIAL_TIMEOUT
+
+    def add(self, latency):
+        self.window.append(latency)
+        self.count += 1
+        if self.count % RECOMPUTE_EVERY == 0 or self.count == MIN_SAMPLES:
+            self.refresh()
+
+    def refresh(self):
+        self.timeout = adaptive_timeout(self.window)
+
+
+async def resolve(host, timeout):
+    """True if host has at least one address"""
+    loop = asyncio.get_running_loop()
+    try:
+        addresses = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    return bool(addresses)
+
+
+async def probe(host, scheme, timeout):
+    """Connect to host over scheme and send a HEAD request.
+    Returns (connection latency, status code or None, Location header or None), or None if unreachable."""
+    port = 443 if scheme == 'https' else 80
+    context = ssl.create_default_context() if scheme == 'https' else None
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context, server_hostname=host if context else None),
+            timeout)
+    except (OSError, ssl.SSLError, asyncio.TimeoutError):
+        return None
+    latency = time.perf_counter() - started
+
+    status, location = None, None
+    try:
+        writer.write(f"HEAD / HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n"
+                     f"Accept: */*\r\nConnection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'location':
+                location = value.strip()
+    except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError):
+        # The server accepted the connection, which is enough to hand it to the browser
+        pass
+    finally:
+        writer.close()
+    return latency, status, location
+
+
+async def check_domain(domain, latencies):
+    """Find the first host/scheme of domain that answers, and where it redirects to"""
+    started = time.perf_counter()
+    result = {'domain': domain, 'reachable': False, 'url': None, 'scheme': None, 'status': None,
+              'latency': None, 'error': 'dns'}
+    hosts = [domain] if domain.startswith('www.') else [domain, f"www.{domain}"]
+    for host in hosts:
+        if not await resolve(host, latencies.timeout):
+            continue
+        result['error'] = 'connect'
+        for scheme in ['https', 'http']:
+            answer = await probe(host, scheme, latencies.timeout)
+            if answer is None:
+                continue
+            latency, status, location = answer
+            latencies.add(latency)
+            url = f"{scheme}://{host}/"
+            if status is not None and 300 <= status < 400 and location:
+                # Start the browser on the redirect target to save a round trip
+                url = urljoin(url, location)
+            result.update(reachable=True, url=url, scheme=scheme, status=status, latency=latency,
+                          error=None)
+            break
+        if result['reachable']:
+            break
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+
+async def probe_worker(jobs, results, latencies):
+    """Check domains from the shared jobs iterator until it is exhausted"""
+    for index, domain in jobs:
+        results[index] = await check_domain(domain, latencies)
+
+
+async def check_all(domains):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=PREFLIGHT_CONCURRENCY, thread_name_prefix='dns'))
+    # A fixed set of workers pulls domains one by one, instead of one task per domain
+    jobs = enumerate(domains)
+    results = [None] * len(domains)
+    latencies = LatencyTracker()
+    workers = min(PREFLIGHT_CONCURRENCY, len(domains))
+    await asyncio.gather(*(probe_worker(jobs, results, latencies) for _ in range(workers)))
+    latencies.refresh()
+    return results, latencies.timeout
+
+
+def check_domains(domains):
+    """Probe every domain concurrently before any browser is used. Returns {domain: result};
+    each result carries the connect timeout adapted from the most recent latencies."""
+    if not domains:
+        return {}
+    results, timeout = asyncio.run(check_all(domains))
+    for result in results:
+        result['timeout'] = timeout
+    reachable = sum(result['reachable'] for result in results)
+    print(f"Pre-flight: {reachable}/{len(results)} domenii accesibile, timeout de conectare {timeout:.1f}s")
+    return {result['domain']: result for result in results}
@@ -0,0 +1,270 @@
+import math
+
+import numpy as np
+
+# Background color the normalised logos are centered on
+MAGENTA = (255, 0, 255)
+
+
+# === Perceptual hashes ===
+
+def content_box(arr, bg_color=MAGENTA):
+    """Crop an (H, W, 3) image to the bounding box of its non-background pixels"""
+    mask = ~np.all(arr == bg_color, axis=-1)
+    if not mask.any():
+        return None
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    return arr[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+def to_gray(arr):
+    """Luma of an (H, W, 3) uint8 image as float32"""
+    return arr[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def area_resize(gray, height, width):
+    """Downsample a 2D array by averaging the pixels falling in each output cell"""
+    h, w = gray.shape
+    # Upsample tiny crops first so every output cell covers at least one pixel
+    if h < height:
+        gray = np.repeat(gray, -(-height // h), axis=0)
+    if w < width:
+        gray = np.repeat(gray, -(-width // w), axis=1)
+    h, w = gray.shape
+    row_edges = np.linspace(0, h, height + 1).astype(int)[:-1]
+    col_edges = np.linspace(0, w, width + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray, row_edges, axis=0), col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, h)), np.diff(np.append(col_edges, w)))
+    return sums / counts
+
+
+def bits_to_int(bits):
+    """Pack a boolean array into a Python int, first element as most significant bit"""
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def average_hash(gray, hash_size=8):
+    small = area_resize(gray, hash_size, hash_size)
+    return bits_to_int(small > small.mean())
+
+
+def difference_hash(gray, hash_size=8):
+    small = area_resize(gray, hash_size, hash_size + 1)
+    return bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def perceptual_hash(gray, hash_size=8):
+    small = area_resize(gray, 32, 32)
+    dct = _DCT_32 @ small @ _DCT_32.T
+    low = dct[:hash_size, :hash_size]
+    return bits_to_int(low > np.median(low))
+
+
+def image_hashes(arr):
+    """aHash, dHash and pHash of a normalised logo, computed on its content only"""
+    box = content_box(arr)
+    if box is None:
+        return None
+    gray = to_gray(box)
+    return {
+        'ahash': average_hash(gray),
+        'dhash': difference_hash(gray),
+        'phash': perceptual_hash(gray),
+    }
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+# === Hamming-distance index ===
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes; radius queries visit only a fraction of the nodes"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            children = node[2]
+            if distance not in children:
+                children[distance] = (value, [item], {})
+                return
+            node = children[distance]
+
+    def query(self, value, radius):
+        """All items whose hash is within radius of value"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend(items)
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class DisjointSet:
+    """Union-find with path halving"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def near_duplicate_pairs(hashes, phash_threshold, dhash_threshold):
+    """Index pairs whose pHash and dHash are both within the thresholds.
+    hashes holds image_hashes() results, None entries are skipped."""
+    tree = BKTree()
+    pairs = []
+    for i, h in enumerate(hashes):
+        if h is None:
+            continue
+        for j in tree.query(h['phash'], phash_threshold):
+            if hamming(h['dhash'], hashes[j]['dhash']) <= dhash_threshold:
+                pairs.append((j, i))
+        tree.add(h['phash'], i)
+    return pairs
+
+
+# === Color distance index ===
+
+_RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb):
+    """Convert (N, 3) sRGB values in 0-255 to CIE Lab (D65)"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = linear @ _RGB_TO_XYZ.T / _D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def union_within_radius(points, radius, clusters):
+    """Union in clusters (a DisjointSet over the points) every pair of (N, D) points closer
+    than radius. Identical points are joined directly and compared once; the distinct ones
+    go in a uniform grid with cells of size radius, and each is only compared with the
+    points of its neighbouring cells. No list of pairs is built."""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return clusters
+    # Many logos share the exact same color (every all-black icon is (0, 0, 0))
+    unique, first, inverse = np.unique(points, axis=0, return_index=True, return_inverse=True)
+    for i, u in enumerate(inverse.ravel()):
+        clusters.union(int(first[u]), i)
+
+    cells = np.floor(unique / radius).astype(np.int64)
+    grid = {}
+    for u, cell in enumerate(map(tuple, cells)):
+        grid.setdefault(cell, []).append(u)
+
+    dims = unique.shape[1]
+    offsets = np.stack(np.meshgrid(*[[-1, 0, 1]] * dims, indexing='ij'), axis=-1).reshape(-1, dims)
+    for cell, members in grid.items():
+        neighbours = []
+        for offset in offsets:
+            neighbours.extend(grid.get(tuple(np.add(cell, offset)), []))
+        neighbours = np.array(neighbours)
+        for u in members:
+            # Keep each pair once
+            candidates = neighbours[neighbours > u]
+            if len(candidates) == 0:
+                continue
+            distances = np.linalg.norm(unique[candidates] - unique[u], axis=1)
+            for v in candidates[distances <= radius]:
+                clusters.union(int(first[u]), int(first[v]))
+    return clusters
+
+
+# === Fuzzy text index ===
+
+def trigrams(text):
+    """Character trigrams of text, padded so short strings still produce a few"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b, max_distance):
+    """Edit distance between a and b, or max_distance + 1 as soon as it is certainly larger"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def similar_text_pairs(texts, max_edit_ratio):
+    """Index pairs of strings within an edit distance of max_edit_ratio of the longer one.
+    Candidates come from a trigram inverted index, so only strings sharing trigrams are
+    compared: each edit changes at most 3 trigrams, so a pair within max_distance edits
+    shares at least len(grams) - 3 * max_distance of them. The edit distance decides."""
+    postings = {}
+    gram_sets = []
+    pairs = []
+    for i, text in enumerate(texts):
+        grams = trigrams(text)
+        gram_sets.append(grams)
+
+        shared = {}
+        for gram in grams:
+            for j in postings.get(gram, []):
+                shared[j] = shared.get(j, 0) + 1
+
+        for j, count in shared.items():
+            # Rounded up, so a 7-letter name still tolerates 'm' read as 'rn'
+            max_distance = max(1, math.ceil(max_edit_ratio * max(len(text), len(texts[j]))))
+            if count < min(len(grams), len(gram_sets[j])) - 3 * max_distance:
+                continue
+            if levenshtein(text, texts[j], max_distance) <= max_distance:
+                pairs.append((j, i))
+
+        for gram in grams:
+            postings.setdefault(gram, []).append(i)
+    return pairs